@@ -23,6 +23,11 @@ class GotoError(HarambeException):
         )
 
 
+class CircuitOpenError(HarambeException):
+    def __init__(self, host: str) -> None:
+        super().__init__(f"Circuit open for {host}, skipping navigation")
+
+
 class SchemaValidationError(HarambeException):
     def __init__(self, message: str = None):
         super().__init__(message)
@@ -1,4 +1,11 @@
-from urllib.parse import urljoin, urlparse, urlunparse
+from urllib.parse import (
+    SplitResult,
+    urljoin,
+    urlparse,
+    urlsplit,
+    urlunparse,
+    urlunsplit,
+)
 
 
 def normalize_url(path: str, base_path: str | None) -> str:
@@ -84,3 +91,44 @@ def find_highest_index_before_period(s: str, char: str) -> int:
         if c == char:
             highest_index = i
     return highest_index
+
+
+def merge_query_params(url: str, query: str) -> str:
+    """
+    Merge a query string (eg: "?page=2") into the query of a url. Parameters in `query` replace
+    every parameter of the same name in place, new parameters are appended, and the fragment is dropped.
+    Parameters are merged verbatim so their existing encoding is preserved.
+
+    :param url: the url to merge the parameters into, typically the current page url
+    :param query: the query string to merge, with or without the leading "?"
+    :return: the url with the merged query
+    """
+    parts, current = _split_query(url)
+    updates: dict[str, list[str]] = {}
+    for param in query.lstrip("?").split("&"):
+        if param:
+            updates.setdefault(_param_name(param), []).append(param)
+
+    merged: list[str] = []
+    replaced: set[str] = set()
+    for param in current:
+        name = _param_name(param)
+        if name not in updates:
+            merged.append(param)
+        elif name not in replaced:
+            merged.extend(updates[name])
+            replaced.add(name)
+    for name, params in updates.items():
+        if name not in replaced:
+            merged.extend(params)
+
+    return urlunsplit(parts._replace(query="&".join(merged), fragment=""))
+
+
+def _split_query(url: str) -> tuple[SplitResult, tuple[str, ...]]:
+    parts = urlsplit(url)
+    return parts, tuple(p for p in parts.query.split("&") if p)
+
+
+def _param_name(param: str) -> str:
+    return param.split("=", 1)[0]
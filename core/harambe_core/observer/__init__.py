@@ -1,4 +1,5 @@
 from .types import DownloadMeta, HTMLMetadata, ObservationTrigger
+from .download import DownloadedFile
 from .base import OutputObserver
 from .logging_observer import LoggingObserver
 from .memory_observer import InMemoryObserver
@@ -6,6 +7,7 @@ from .storage_observer import LocalStorageObserver
 
 __all__ = [
     "DownloadMeta",
+    "DownloadedFile",
     "HTMLMetadata",
     "ObservationTrigger",
     "OutputObserver",
@@ -20,6 +20,9 @@ class OutputObserver(Protocol):
     ) -> "DownloadMeta":
         raise NotImplementedError()
 
+    # Observers can also implement `on_download_file(download_url, filename, file: DownloadedFile)` to receive
+    # downloads as a file on disk instead of bytes, `on_download` is used otherwise
+
     @abstractmethod
     async def on_paginate(self, next_url: str) -> None:
         raise NotImplementedError()
@@ -0,0 +1,62 @@
+import asyncio
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+DEFAULT_MAX_IN_MEMORY = 8 * 1024 * 1024
+
+
+class DownloadedFile:
+    """
+    A download already saved to disk, handed to observers implementing `on_download_file` so that they can
+    use the path or stream the content instead of receiving it all as bytes.
+    The browser deletes `path` when its context closes, observers that keep the file around must copy it
+    before returning.
+
+    :param path: where the file was saved
+    :param max_in_memory: files up to this size are kept in memory once read, larger files are read from
+        disk every time. Concurrent reads share a single one either way
+    """
+
+    def __init__(
+        self, path: str | Path, max_in_memory: int = DEFAULT_MAX_IN_MEMORY
+    ) -> None:
+        self.path = Path(path)
+        self.max_in_memory = max_in_memory
+        self._content: Optional[bytes] = None
+        self._reading: Optional[asyncio.Future[bytes]] = None
+
+    @property
+    def size(self) -> int:
+        return self.path.stat().st_size
+
+    async def read(self) -> bytes:
+        if self._content is not None:
+            return self._content
+
+        if self._reading is None:
+            self._reading = asyncio.ensure_future(
+                asyncio.to_thread(self.path.read_bytes)
+            )
+            self._reading.add_done_callback(self._done_reading)
+        # Readers giving up mustn't cancel the read for the others
+        return await asyncio.shield(self._reading)
+
+    def _done_reading(self, reading: asyncio.Future[bytes]) -> None:
+        self._reading = None
+        if not reading.cancelled() and reading.exception() is None:
+            content = reading.result()
+            if len(content) <= self.max_in_memory:
+                self._content = content
+
+    async def chunks(
+        self, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        if self._content is not None:
+            for start in range(0, len(self._content), chunk_size):
+                yield self._content[start : start + chunk_size]
+            return
+
+        with self.path.open("rb") as f:
+            while chunk := await asyncio.to_thread(f.read, chunk_size):
+                yield chunk
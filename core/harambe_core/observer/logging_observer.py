@@ -4,6 +4,7 @@ from urllib.parse import quote
 
 from harambe_core.types import Cookie, LocalStorage, URL, Context, Options, ScrapeResult
 from .base import OutputObserver
+from .download import DownloadedFile
 from .types import DownloadMeta
 
 
@@ -24,6 +25,11 @@ class LoggingObserver(OutputObserver):
             "path": path,
         }
 
+    async def on_download_file(
+        self, download_url: str, filename: str, file: DownloadedFile
+    ) -> "DownloadMeta":
+        return await self.on_download(download_url, filename, b"", str(file.path))
+
     async def on_paginate(self, next_url: str) -> None:
         pass
 
@@ -1,20 +1,208 @@
-from typing import Any, List, Tuple
+import pickle
+import tempfile
+from pathlib import Path
+from typing import (
+    IO,
+    Any,
+    Generic,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+    overload,
+)
 from urllib.parse import quote
 
 from harambe_core.types import URL, Context, Options, Cookie, LocalStorage
 from .base import OutputObserver
 from .types import DownloadMeta
 
+T = TypeVar("T")
+
+
+class SpillList(Sequence[T], Generic[T]):
+    """
+    Append-only sequence that keeps the first `capacity` items in memory and
+    pickles every following item to a temporary file. Spilled items are loaded
+    lazily when indexed or iterated.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self._capacity = capacity
+        self._items: List[T] = []
+        self._offsets: List[int] = []
+        self._file: Optional[IO[bytes]] = None
+
+    def append(self, item: T) -> None:
+        if len(self._items) < self._capacity:
+            self._items.append(item)
+            return
+
+        if self._file is None:
+            self._file = tempfile.TemporaryFile()
+
+        self._file.seek(0, 2)
+        self._offsets.append(self._file.tell())
+        pickle.dump(item, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def extend(self, items: Sequence[T]) -> None:
+        for item in items:
+            self.append(item)
+
+    @property
+    def spilled(self) -> int:
+        return len(self._offsets)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._offsets.clear()
+
+    def _load(self, index: int) -> T:
+        assert self._file is not None
+        self._file.seek(self._offsets[index])
+        return pickle.load(self._file)
+
+    def __len__(self) -> int:
+        return len(self._items) + len(self._offsets)
+
+    @overload
+    def __getitem__(self, index: int) -> T: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[T]: ...
+
+    def __getitem__(self, index: int | slice) -> T | List[T]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("SpillList index out of range")
+
+        if index < len(self._items):
+            return self._items[index]
+        return self._load(index - len(self._items))
+
+    def __iter__(self) -> Iterator[T]:
+        yield from self._items
+        for i in range(len(self._offsets)):
+            yield self._load(i)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return f"SpillList(in_memory={len(self._items)}, spilled={self.spilled})"
+
+
+class _SpilledFiles(Sequence[Tuple[str, bytes]]):
+    """
+    Keeps the first `capacity` downloads in memory and writes the content of
+    every following download to its own file, holding only the path in memory.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self._capacity = capacity
+        self._entries: List[Tuple[str, bytes | Path]] = []
+        self._dir: Optional[tempfile.TemporaryDirectory[str]] = None
+
+    def append(self, item: Tuple[str, bytes]) -> None:
+        filename, content = item
+        if len(self._entries) < self._capacity:
+            self._entries.append((filename, content))
+            return
+
+        if self._dir is None:
+            self._dir = tempfile.TemporaryDirectory(prefix="harambe-downloads-")
+
+        path = Path(self._dir.name) / str(len(self._entries))
+        path.write_bytes(content)
+        self._entries.append((filename, path))
+
+    def close(self) -> None:
+        if self._dir is not None:
+            self._dir.cleanup()
+            self._dir = None
+        self._entries = [e for e in self._entries if not isinstance(e[1], Path)]
+
+    @staticmethod
+    def _load(entry: Tuple[str, bytes | Path]) -> Tuple[str, bytes]:
+        filename, content = entry
+        if isinstance(content, Path):
+            return filename, content.read_bytes()
+        return filename, content
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @overload
+    def __getitem__(self, index: int) -> Tuple[str, bytes]: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Tuple[str, bytes]]: ...
+
+    def __getitem__(
+        self, index: int | slice
+    ) -> Tuple[str, bytes] | List[Tuple[str, bytes]]:
+        if isinstance(index, slice):
+            return [self._load(e) for e in self._entries[index]]
+        return self._load(self._entries[index])
+
+    def __iter__(self) -> Iterator[Tuple[str, bytes]]:
+        return (self._load(e) for e in self._entries)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+
+_Collection = Union[List[T], SpillList[T]]
+
+
+def _collection(capacity: Optional[int]) -> _Collection[T]:
+    return [] if capacity is None else SpillList(capacity)
+
 
 class InMemoryObserver(OutputObserver):
-    def __init__(self) -> None:
-        self._data: List[dict[str, Any]] = []
-        self._urls: List[Tuple[URL, Context, Options]] = []
-        self._files: List[Tuple[str, bytes]] = []
-        self._cookies: List[Cookie] = []
-        self._local_storage: List[LocalStorage] = []
+    """
+    Observer that keeps everything it receives in memory.
+
+    :param capacity: Optional number of items to keep in memory per collection. Anything
+        past that is spilled to temporary files and read back lazily when accessed.
+        Call `close` to remove the temporary files early.
+    """
+
+    def __init__(self, capacity: Optional[int] = None) -> None:
+        self._capacity = capacity
+        self._data: _Collection[dict[str, Any]] = _collection(capacity)
+        self._urls: _Collection[Tuple[URL, Context, Options]] = _collection(capacity)
+        self._files: List[Tuple[str, bytes]] | _SpilledFiles = (
+            [] if capacity is None else _SpilledFiles(capacity)
+        )
+        self._cookies: _Collection[Cookie] = _collection(capacity)
+        self._local_storage: _Collection[LocalStorage] = _collection(capacity)
         self._paths: List[str] = []
 
+    def close(self) -> None:
+        for collection in (
+            self._data,
+            self._urls,
+            self._files,
+            self._cookies,
+            self._local_storage,
+        ):
+            if isinstance(collection, (SpillList, _SpilledFiles)):
+                collection.close()
+
     async def on_save_data(self, data: dict[str, Any]) -> None:
         self._data.append(data)
 
@@ -45,15 +233,15 @@ class InMemoryObserver(OutputObserver):
         self._local_storage.extend(local_storage)
 
     @property
-    def data(self) -> List[dict[str, Any]]:
+    def data(self) -> Sequence[dict[str, Any]]:
         return self._data
 
     @property
-    def urls(self) -> List[Tuple[URL, Context, Options]]:
+    def urls(self) -> Sequence[Tuple[URL, Context, Options]]:
         return self._urls
 
     @property
-    def files(self) -> List[Tuple[str, bytes]]:
+    def files(self) -> Sequence[Tuple[str, bytes]]:
         return self._files
 
     @property
@@ -61,9 +249,9 @@ class InMemoryObserver(OutputObserver):
         return self._paths
 
     @property
-    def cookies(self) -> List[Cookie]:
+    def cookies(self) -> Sequence[Cookie]:
         return self._cookies
 
     @property
-    def local_storage(self) -> List[LocalStorage]:
+    def local_storage(self) -> Sequence[LocalStorage]:
         return self._local_storage
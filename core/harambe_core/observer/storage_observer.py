@@ -4,6 +4,7 @@ from urllib.parse import quote
 
 from harambe_core.types import URL, Context, Options, Cookie, LocalStorage
 from .base import OutputObserver
+from .download import DownloadedFile
 from .types import DownloadMeta
 
 
@@ -50,6 +51,11 @@ class LocalStorageObserver(OutputObserver):
         self._tracker.save_data(data)  # type: ignore
         return data
 
+    async def on_download_file(
+        self, download_url: str, filename: str, file: DownloadedFile
+    ) -> DownloadMeta:
+        return await self.on_download(download_url, filename, b"", str(file.path))
+
     async def on_paginate(self, next_url: str) -> None:
         pass
 
@@ -0,0 +1,51 @@
+import asyncio
+
+from harambe_core.observer import DownloadedFile
+
+
+async def test_small_files_are_read_once(tmp_path, mocker):
+    path = tmp_path / "small.pdf"
+    path.write_bytes(b"%PDF" * 4)
+    file = DownloadedFile(path, max_in_memory=16)
+    read_bytes = mocker.spy(type(path), "read_bytes")
+
+    assert await file.read() == b"%PDF" * 4
+    assert await file.read() == b"%PDF" * 4
+    assert read_bytes.call_count == 1
+    assert file.size == 16
+
+
+async def test_large_files_are_not_kept_in_memory(tmp_path, mocker):
+    path = tmp_path / "large.pdf"
+    path.write_bytes(b"%PDF" * 5)
+    file = DownloadedFile(path, max_in_memory=16)
+    read_bytes = mocker.spy(type(path), "read_bytes")
+
+    assert await file.read() == b"%PDF" * 5
+    assert await file.read() == b"%PDF" * 5
+    assert read_bytes.call_count == 2
+
+
+async def test_chunks(tmp_path):
+    path = tmp_path / "file.bin"
+    path.write_bytes(bytes(range(10)))
+
+    for max_in_memory in (0, 10):
+        file = DownloadedFile(path, max_in_memory=max_in_memory)
+        await file.read()
+        chunks = [chunk async for chunk in file.chunks(chunk_size=4)]
+        assert chunks == [bytes(range(4)), bytes(range(4, 8)), bytes([8, 9])]
+
+
+async def test_concurrent_reads_share_one(tmp_path, mocker):
+    path = tmp_path / "large.pdf"
+    path.write_bytes(b"%PDF" * 5)
+    file = DownloadedFile(path, max_in_memory=16)
+    read_bytes = mocker.spy(type(path), "read_bytes")
+
+    contents = await asyncio.gather(*[file.read() for _ in range(3)])
+
+    assert contents == [b"%PDF" * 5] * 3
+    assert read_bytes.call_count == 1
+    assert await file.read() == b"%PDF" * 5
+    assert read_bytes.call_count == 2
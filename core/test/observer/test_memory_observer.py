@@ -0,0 +1,50 @@
+from harambe_core.observer import InMemoryObserver
+from harambe_core.observer.memory_observer import SpillList
+
+
+def test_spill_list_keeps_capacity_in_memory():
+    items = SpillList(capacity=2)
+    items.extend([{"a": 1}, {"b": 2}, {"c": 3}, {"d": 4}])
+
+    assert len(items) == 4
+    assert items.spilled == 2
+    assert items[0] == {"a": 1}
+    assert items[2] == {"c": 3}
+    assert items[-1] == {"d": 4}
+    assert items[1:3] == [{"b": 2}, {"c": 3}]
+    assert list(items) == [{"a": 1}, {"b": 2}, {"c": 3}, {"d": 4}]
+
+
+async def test_unbounded_observer_uses_lists():
+    observer = InMemoryObserver()
+
+    await observer.on_save_data({"foo": "bar"})
+
+    assert observer.data == [{"foo": "bar"}]
+    assert isinstance(observer.data, list)
+
+
+async def test_bounded_observer_spills_to_disk():
+    observer = InMemoryObserver(capacity=1)
+
+    for i in range(3):
+        await observer.on_save_data({"row": i})
+        await observer.on_queue_url(f"https://example.com/{i}", {}, {})
+        await observer.on_download("https://example.com", f"{i}.pdf", b"%PDF" * i, "")
+
+    assert observer.data == [{"row": 0}, {"row": 1}, {"row": 2}]
+    assert [url for url, _, _ in observer.urls] == [
+        "https://example.com/0",
+        "https://example.com/1",
+        "https://example.com/2",
+    ]
+    assert list(observer.files) == [
+        ("0.pdf", b""),
+        ("1.pdf", b"%PDF"),
+        ("2.pdf", b"%PDF%PDF"),
+    ]
+    assert observer.files[-1] == ("2.pdf", b"%PDF%PDF")
+
+    observer.close()
+    assert len(observer.data) == 1
+    assert len(observer.files) == 1
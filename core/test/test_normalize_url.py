@@ -1,6 +1,10 @@
 import pytest
 
-from harambe_core.normalize_url import normalize_url, sanitize_scheme
+from harambe_core.normalize_url import (
+    merge_query_params,
+    normalize_url,
+    sanitize_scheme,
+)
 
 
 @pytest.mark.parametrize(
@@ -136,3 +140,37 @@ def test_normalize_url(base_path, url, expected):
 )
 def test_sanitize_scheme(input_url, expected_url):
     assert sanitize_scheme(input_url) == expected_url
+
+
+@pytest.mark.parametrize(
+    "url, query, expected",
+    [
+        (
+            "https://example.com/list",
+            "?page=2",
+            "https://example.com/list?page=2",
+        ),
+        (
+            "https://example.com/list?q=shoes&page=1&sort=asc#top",
+            "?page=2",
+            "https://example.com/list?q=shoes&page=2&sort=asc",
+        ),
+        (
+            "https://example.com/list?q=red%20shoes&page=1",
+            "?page=2&size=50",
+            "https://example.com/list?q=red%20shoes&page=2&size=50",
+        ),
+        (
+            "https://example.com/list?tag=a&tag=b&page=1",
+            "tag=c",
+            "https://example.com/list?tag=c&page=1",
+        ),
+        (
+            "https://example.com/list?page=1",
+            "?",
+            "https://example.com/list?page=1",
+        ),
+    ],
+)
+def test_merge_query_params(url, query, expected):
+    assert merge_query_params(url, query) == expected
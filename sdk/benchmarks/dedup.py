@@ -0,0 +1,47 @@
+"""
+Compare memory usage and throughput of the DuplicateHandler dedup backends.
+
+    uv run python benchmarks/dedup.py [rows]
+"""
+
+import sys
+import time
+import tracemalloc
+
+from harambe.pagination import DuplicateHandler
+
+
+def make_row(i: int) -> dict[str, str]:
+    return {
+        "title": f"Product {i}",
+        "price": f"{i % 1000}.99",
+        "url": f"https://example.com/products/{i}",
+    }
+
+
+def bench(backend: str, rows: int) -> None:
+    handler = DuplicateHandler(backend=backend)  # type: ignore
+    start = time.perf_counter()
+    duplicates = sum(handler.on_save_data(make_row(i)) for i in range(rows))
+    elapsed = time.perf_counter() - start
+
+    # Memory is measured in a separate pass as tracing skews the timings
+    tracemalloc.start()
+    handler = DuplicateHandler(backend=backend)  # type: ignore
+    baseline, _ = tracemalloc.get_traced_memory()
+    for i in range(rows):
+        handler.on_save_data(make_row(i))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{backend:>6}: {rows / elapsed:>10,.0f} rows/s"
+        f" | {(current - baseline) / 1024 / 1024:>8.2f} MiB"
+        f" | {duplicates} false positives"
+    )
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    for name in ("exact", "bloom"):
+        bench(name, n)
@@ -0,0 +1,53 @@
+"""
+Compare DuplicateHandler.compute_hash with the previous json.dumps + md5 implementation.
+
+    uv run python benchmarks/hashing.py
+"""
+
+import hashlib
+import json
+import timeit
+from typing import Any
+
+from harambe.pagination import DuplicateHandler
+
+
+def legacy_compute_hash(data: Any) -> bytes:
+    if isinstance(data, dict):
+        data = {k: v for k, v in data.items() if not k.startswith("__")}
+
+    data_str = json.dumps(data, separators=(",", ":"), sort_keys=True)
+    return hashlib.md5(data_str.encode()).digest()
+
+
+SAMPLES = {
+    "flat row": {
+        "title": "Product 1",
+        "price": "12.99",
+        "url": "https://example.com/products/1",
+        "sku": "ABC-1",
+        "in_stock": True,
+        "__url": "https://example.com/products",
+    },
+    "nested row": {
+        "title": "Product 1",
+        "description": "x" * 500,
+        "tags": ["a", "b", "c"],
+        "variants": [{"size": s, "price": 10.5} for s in ("S", "M", "L")],
+        "__url": "https://example.com/products",
+    },
+    "url": "https://example.com/products/12345?page=2",
+    "download": ("https://example.com/file.pdf", "file.pdf"),
+}
+
+
+if __name__ == "__main__":
+    for name, sample in SAMPLES.items():
+        legacy, current = (
+            min(timeit.repeat(lambda: fn(sample), number=50_000, repeat=5))
+            for fn in (legacy_compute_hash, DuplicateHandler.compute_hash)
+        )
+        print(
+            f"{name:>10}: legacy {legacy * 20:.2f} us"
+            f" | current {current * 20:.2f} us | {legacy / current:.1f}x"
+        )
@@ -0,0 +1,37 @@
+"""
+Measure next page url resolution as done by `SDK.paginate` for `?`-prefixed urls.
+The current page url is resolved twice per page when the soup harness prefetches.
+
+    uv run python benchmarks/pagination_urls.py [pages]
+"""
+
+import sys
+import timeit
+
+from harambe_core.normalize_url import normalize_url
+
+from harambe.pagination import resolve_next_page_url
+
+
+def legacy(current_url: str, next_url: str) -> str:
+    next_url = current_url.split("?")[0] + next_url
+    return normalize_url(next_url, current_url)
+
+
+def current(current_url: str, next_url: str) -> str:
+    return resolve_next_page_url(current_url, next_url)
+
+
+def run(resolve, pages: int) -> None:
+    for page in range(1, pages + 1):
+        url = f"https://example.com/search?q=red%20shoes&sort=price&page={page}"
+        for _ in range(2):
+            resolve(url, f"?page={page + 1}")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    print(f"merged: {current('https://example.com/s?q=a&page=1#top', '?page=2')}")
+    for fn in (legacy, current):
+        elapsed = min(timeit.repeat(lambda: run(fn, n), number=1, repeat=5))
+        print(f"{fn.__name__:>7}: {elapsed / n * 1e6:.2f} us per page")
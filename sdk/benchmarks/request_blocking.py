@@ -0,0 +1,87 @@
+"""
+Compare page load time with no request blocking, the Python route handler and native blocking.
+Serves a page with many images, fonts and stylesheets from a local server.
+
+    uv run python benchmarks/request_blocking.py [loads] [browser_type]
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from harambe.contrib import playwright_harness
+from harambe.handlers import FAKE_IMAGE_BYTES
+
+ASSETS = 200
+
+PAGE = "".join(
+    [
+        "<html><head>",
+        *(f'<link rel="stylesheet" href="/css/{i}.css">' for i in range(10)),
+        "<style>",
+        *(
+            f"@font-face {{ font-family: f{i}; src: url(/fonts/{i}.woff2); }}"
+            f" .f{i} {{ font-family: f{i}; }}"
+            for i in range(10)
+        ),
+        "</style></head><body>",
+        *(f'<p class="f{i}">text</p>' for i in range(10)),
+        *(f'<img src="/img/{i}.png">' for i in range(ASSETS)),
+        "</body></html>",
+    ]
+).encode()
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        body, content_type = {
+            "/img": (FAKE_IMAGE_BYTES * 64, "image/png"),
+            "/fon": (b"\0" * 4096, "font/woff2"),
+            "/css": (b"body { margin: 0 }", "text/css"),
+        }.get(self.path[:4], (PAGE, "text/html"))
+
+        # Simulate some network latency for every request
+        time.sleep(0.005)
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_) -> None:
+        pass
+
+
+async def bench(name: str, url: str, loads: int, browser_type: str, **options) -> None:
+    async with playwright_harness(browser_type=browser_type, **options) as page_factory:  # type: ignore
+        page = await page_factory()
+        await page.goto(url)  # warm up
+
+        start = time.perf_counter()
+        for _ in range(loads):
+            await page.goto(url, wait_until="load")
+        elapsed = time.perf_counter() - start
+
+    print(f"{name:>8}: {elapsed / loads * 1000:>8.1f} ms/load")
+
+
+async def main(loads: int, browser_type: str) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/"
+
+    await bench("none", url, loads, browser_type, abort_unnecessary_requests=False)
+    await bench("route", url, loads, browser_type, blocking_mode="route")
+    await bench("native", url, loads, browser_type, blocking_mode="native")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(
+            int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+            sys.argv[2] if len(sys.argv) > 2 else "chromium",
+        )
+    )
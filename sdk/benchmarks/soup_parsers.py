@@ -0,0 +1,44 @@
+"""
+Compare parse and select times of the SoupPage parser backends on the pages in test/mock_html.
+The lxml and selectolax backends need the `parsers` extra.
+
+    uv run python benchmarks/soup_parsers.py [repeat]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+from harambe.contrib.soup.impl import parse_html
+
+PAGES = Path(__file__).parent.parent / "test" / "mock_html"
+PARSERS = ("html.parser", "lxml", "selectolax")
+SELECTORS = ("a", "h1", "div p", "table tr td", "[href]", "li > a", "meta[name]")
+
+
+def bench(parser: str, pages: list[str], repeat: int) -> None:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        documents = [parse_html(html, parser) for html in pages]  # type: ignore
+    parse = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for document in documents:
+            for selector in SELECTORS:
+                document.select(selector)
+    select = time.perf_counter() - start
+
+    calls = repeat * len(pages)
+    print(
+        f"{parser:>12}: parse {parse / calls * 1000:>7.2f} ms/page"
+        f" | select {select / (calls * len(SELECTORS)) * 1000:>7.3f} ms/selector"
+    )
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    html = [p.read_text() for p in sorted(PAGES.glob("*.html"))]
+    print(f"{len(html)} pages, {sum(map(len, html)) / 1024:.0f} KiB")
+    for name in PARSERS:
+        bench(name, html, n)
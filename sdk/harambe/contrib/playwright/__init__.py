@@ -1,3 +1,4 @@
 from .harness import playwright_harness
+from .pool import BrowserPool
 
-__all__ = ["playwright_harness"]
+__all__ = ["playwright_harness", "BrowserPool"]
@@ -0,0 +1,191 @@
+import hashlib
+import json
+from collections import defaultdict
+from typing import Any, Optional, Sequence
+
+from playwright.async_api import Browser, BrowserContext, Page, ViewportSize
+from playwright_stealth import stealth_async
+
+from harambe.handlers import (
+    BlockingMode,
+    CachingResourceHandler,
+    NativeResourceBlocker,
+    RateLimitHandler,
+    ReplayHandler,
+    ResourceBlockingPolicy,
+    UnnecessaryResourceHandler,
+)
+from harambe.http_cache import ResponseCache
+from harambe.proxy import proxy_from_url
+from harambe.rate_limit import HostRateLimiter
+from harambe.replay import ResponseArchive
+from harambe.types import LocalStorage, SetCookieParam
+from harambe.user_agent import UserAgentFactory, compute_user_agent, random_user_agent
+
+DEFAULT_VIEWPORT: ViewportSize = {"width": 1440, "height": 1024}
+
+_native_blocker = NativeResourceBlocker()
+
+
+def build_storage_state(local_storage: Sequence[LocalStorage]) -> dict[str, Any]:
+    domain_storage = defaultdict(list)
+    for item in local_storage:
+        domain_storage[item["domain"]].append(item)
+
+    return {
+        "origins": [
+            {
+                "origin": f"https://{domain}",
+                "localStorage": [
+                    {
+                        "name": item["key"],
+                        # Local storage only supports strings
+                        "value": (
+                            json.dumps(item["value"])
+                            if isinstance(item["value"], (dict, list))
+                            else str(item["value"])
+                        ),
+                    }
+                    for item in items
+                ],
+            }
+            for domain, items in domain_storage.items()
+        ]
+    }
+
+
+async def create_context(
+    browser: Browser,
+    *,
+    proxy: str | None = None,
+    cookies: Sequence[SetCookieParam] = (),
+    local_storage: Sequence[LocalStorage] = (),
+    headers: dict[str, str] | None = None,
+    default_timeout: int = 30000,
+    abort_unnecessary_requests: bool = True,
+    blocking_mode: BlockingMode = "route",
+    resource_blocking: Optional[ResourceBlockingPolicy] = None,
+    response_cache: Optional[ResponseCache] = None,
+    cache_documents: bool = False,
+    response_archive: Optional[ResponseArchive] = None,
+    rate_limiter: Optional[HostRateLimiter] = None,
+    user_agent: UserAgentFactory = random_user_agent,
+    viewport: Optional[ViewportSize] = None,
+    enable_clipboard: bool = False,
+) -> BrowserContext:
+    """
+    Create a new context with the viewport, user agent and storage state, configured with `configure_context`
+    """
+    ctx = await browser.new_context(
+        viewport=viewport or DEFAULT_VIEWPORT,
+        ignore_https_errors=True,
+        user_agent=await compute_user_agent(user_agent),
+        proxy=proxy_from_url(proxy) if proxy else None,
+        permissions=["clipboard-read", "clipboard-write"] if enable_clipboard else None,
+        storage_state=build_storage_state(local_storage),  # type: ignore
+    )
+    await configure_context(
+        ctx,
+        cookies=cookies,
+        headers=headers,
+        default_timeout=default_timeout,
+        abort_unnecessary_requests=abort_unnecessary_requests,
+        blocking_mode=blocking_mode,
+        resource_blocking=resource_blocking,
+        response_cache=response_cache,
+        cache_documents=cache_documents,
+        response_archive=response_archive,
+        rate_limiter=rate_limiter,
+    )
+    return ctx
+
+
+async def configure_context(
+    ctx: BrowserContext,
+    *,
+    cookies: Sequence[SetCookieParam] = (),
+    headers: dict[str, str] | None = None,
+    default_timeout: int = 30000,
+    abort_unnecessary_requests: bool = True,
+    blocking_mode: BlockingMode = "route",
+    resource_blocking: Optional[ResourceBlockingPolicy] = None,
+    response_cache: Optional[ResponseCache] = None,
+    cache_documents: bool = False,
+    response_archive: Optional[ResponseArchive] = None,
+    rate_limiter: Optional[HostRateLimiter] = None,
+) -> None:
+    """
+    Apply the timeout, headers, cookies and routes to a context, either a new one or one attached to over CDP.
+    Requests are routed through `resource_blocking`, or the default policy when it isn't given, and then
+    through the `rate_limiter`, the `response_archive` and the `response_cache` if there are any. Recorded runs
+    still use the cache, and record the responses it serves, while replayed runs never reach it.
+    With the "native" `blocking_mode` pages must be set up with `block_requests` as well.
+    """
+    ctx.set_default_timeout(default_timeout)
+
+    # Routes run in reverse order of registration, so blocking runs first, then record/replay or the cache
+    cache = (
+        CachingResourceHandler(response_cache, cache_documents=cache_documents)
+        if response_cache
+        else None
+    )
+    if response_archive:
+        # Recording fulfills every request, it goes through the cache itself. Replayed runs don't use it
+        recording_cache = cache if response_archive.mode == "record" else None
+        await ctx.route("**/*", ReplayHandler(response_archive, recording_cache).handle)
+    elif cache:
+        await ctx.route("**/*", cache.handle)
+
+    # Replayed runs don't touch the network, there is nothing to limit
+    if rate_limiter and not (response_archive and response_archive.mode == "replay"):
+        throttle = RateLimitHandler(rate_limiter)
+        await ctx.route("**/*", throttle.handle)
+        ctx.on("response", throttle.on_response)
+
+    if headers:
+        await ctx.set_extra_http_headers(headers)
+
+    if cookies:
+        await ctx.add_cookies(cookies)  # type: ignore
+
+    if abort_unnecessary_requests and blocking_mode == "native":
+        await _native_blocker.attach_to_context(ctx)
+    elif abort_unnecessary_requests:
+        policy = resource_blocking or UnnecessaryResourceHandler()
+        await ctx.route("**/*", policy.handle)
+
+
+async def block_requests(
+    page: Page, abort_unnecessary_requests: bool, blocking_mode: BlockingMode
+) -> None:
+    """Per page part of the "native" blocking mode"""
+    if abort_unnecessary_requests and blocking_mode == "native":
+        await _native_blocker.attach_to_page(page)
+
+
+async def create_page(
+    ctx: BrowserContext,
+    stealth: bool = False,
+    abort_unnecessary_requests: bool = True,
+    blocking_mode: BlockingMode = "route",
+) -> Page:
+    page = await ctx.new_page()
+    await block_requests(page, abort_unnecessary_requests, blocking_mode)
+    if stealth:
+        await stealth_async(page)
+    return page
+
+
+def _key_default(value: Any) -> str:
+    if callable(value):
+        return f"{getattr(value, '__module__', '')}.{getattr(value, '__qualname__', repr(value))}"
+    return repr(value)
+
+
+def context_key(**options: Any) -> str:
+    """
+    Hash of the options passed to `create_context` and `create_page`, contexts created with the same key
+    are interchangeable. Callables such as a user agent factory are keyed by their qualified name.
+    """
+    encoded = json.dumps(options, sort_keys=True, default=_key_default)
+    return hashlib.blake2b(encoded.encode(), digest_size=16).hexdigest()
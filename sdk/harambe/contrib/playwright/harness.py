@@ -1,23 +1,29 @@
-import json
-from collections import defaultdict
-from contextlib import asynccontextmanager
-from typing import Any, AsyncGenerator, Awaitable, Callable, Optional, Sequence, cast
+from contextlib import AsyncExitStack, asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncGenerator, Awaitable, Callable, Optional, Sequence
 
 from playwright.async_api import BrowserContext, ViewportSize, async_playwright, Page
 from playwright_stealth import stealth_async
 
+from harambe.contrib.playwright.context import (  # noqa: F401
+    DEFAULT_VIEWPORT,
+    block_requests,
+    configure_context,
+    create_context,
+)
 from harambe.contrib.playwright.impl import PlaywrightPage
-from harambe.handlers import UnnecessaryResourceHandler
-from harambe.proxy import proxy_from_url
+from harambe.contrib.playwright.pool import BrowserPool, launch_browser
+from harambe.handlers import BlockingMode, ResourceBlockingPolicy
+from harambe.http_cache import ResponseCache
+from harambe.rate_limit import HostRateLimiter
+from harambe.replay import open_response_archive
 from harambe.types import SetCookieParam, BrowserType, LocalStorage
-from harambe.user_agent import random_user_agent, compute_user_agent, UserAgentFactory
+from harambe.user_agent import random_user_agent, UserAgentFactory
 
 Callback = Callable[[BrowserContext], Awaitable[None]]
 PageCallback = Callable[[Page], Awaitable[None]]
 PageFactory = Callable[..., Awaitable[PlaywrightPage]]
 
-DEFAULT_VIEWPORT: ViewportSize = {"width": 1440, "height": 1024}
-
 
 @asynccontextmanager
 async def playwright_harness(
@@ -31,6 +37,13 @@ async def playwright_harness(
     stealth: bool = False,
     default_timeout: int = 30000,
     abort_unnecessary_requests: bool = True,
+    blocking_mode: BlockingMode = "route",
+    resource_blocking: Optional[ResourceBlockingPolicy] = None,
+    response_cache: Optional[ResponseCache] = None,
+    cache_documents: bool = False,
+    record_to: str | Path | None = None,
+    replay_from: str | Path | None = None,
+    rate_limiter: Optional[HostRateLimiter] = None,
     user_agent: UserAgentFactory = random_user_agent,
     viewport: Optional[ViewportSize] = None,
     on_start: Optional[Callback] = None,
@@ -42,106 +55,89 @@ async def playwright_harness(
     extensions: Sequence[str] = (),
     attach_to_existing_context: bool = False,
     attach_to_existing_page: bool = False,
+    browser_pool: Optional[BrowserPool] = None,
     **__: Any,
 ) -> AsyncGenerator[PageFactory, None]:
     """
     Context manager for Playwright. Starts a new browser, context, and page, and closes them when done.
     Also does some basic setup like setting the viewport, user agent, ignoring HTTPS errors,
     creation of HAR file, and stealth.
-    """
-    async with async_playwright() as p:
-        extension_args = []
-        browser_type = browser_type or "chromium"
-
-        if extensions and browser_type == "chromium":
-            extension_paths = ",".join(extensions)
-            extension_args.extend(
-                [
-                    f"--disable-extensions-except={extension_paths}",
-                    f"--load-extension={extension_paths}",
-                ]
-            )
 
-        browser = await (
-            p.chromium.connect_over_cdp(endpoint_url=cdp_endpoint)
-            if cdp_endpoint
-            else getattr(p, cast(str, browser_type)).launch(
-                headless=headless,
-                args=[
-                    *launch_args,
-                    *extension_args,
-                    *(
-                        # Disables navigator.webdriver showing up
-                        ["--disable-blink-features=AutomationControlled"]
-                        if browser_type == "chromium"
-                        else []
-                    ),
-                    *(
-                        # New chromium headless mode
-                        ["--headless=new"] if headless else []
-                    ),
-                ],
-            )
-        )
-
-        domain_storage = defaultdict(list)
-        for item in local_storage:
-            domain_storage[item["domain"]].append(item)
-
-        # Create the storage state structure
-        storage_state = {
-            "origins": [
-                {
-                    "origin": f"https://{domain}",
-                    "localStorage": [
-                        {
-                            "name": item["key"],
-                            # Local storage only supports strings
-                            "value": (
-                                json.dumps(item["value"])
-                                if isinstance(item["value"], (dict, list))
-                                else str(item["value"])
-                            ),
-                        }
-                        for item in items
-                    ],
-                }
-                for domain, items in domain_storage.items()
-            ]
-        }
+    Unnecessary requests are blocked by a Python route handler following the `resource_blocking` policy,
+    or with `blocking_mode="native"` by url patterns the browser matches itself (see `NativeResourceBlocker`).
+    Scripts and stylesheets, and documents with `cache_documents`, are served from the `response_cache`
+    when one is given.
 
-        ctx = (
-            browser.contexts[-1]
-            if attach_to_existing_context and browser.contexts
-            else await browser.new_context(
-                viewport=viewport or DEFAULT_VIEWPORT,
-                ignore_https_errors=True,
-                user_agent=await compute_user_agent(user_agent),
-                proxy=proxy_from_url(proxy) if proxy else None,
-                permissions=["clipboard-read", "clipboard-write"]
-                if enable_clipboard
-                else None,
-                storage_state=storage_state,
-            )
-        )
+    Responses are recorded into an archive with `record_to`, and served from one with `replay_from`
+    (see `ResponseArchive`).
 
-        ctx.set_default_timeout(default_timeout)
+    Navigations wait for their host's turn in the `rate_limiter` when one is given.
 
-        if headers:
-            await ctx.set_extra_http_headers(headers)
+    When a `browser_pool` is given the context is leased from the pool, warm if one is ready, instead of
+    launching a browser, and the browser options (`headless`, `browser_type`, `launch_args`,
+    `extensions`, `cdp_endpoint`) are those of the pool.
+    """
+    async with AsyncExitStack() as stack:
+        warm_page: Optional[Page] = None
+        # Applied to every context, including one attached to with `attach_to_existing_context`
+        configure_options: dict[str, Any] = {
+            "cookies": cookies,
+            "headers": headers,
+            "default_timeout": default_timeout,
+            "abort_unnecessary_requests": abort_unnecessary_requests,
+            "blocking_mode": blocking_mode,
+            "resource_blocking": resource_blocking,
+            "response_cache": response_cache,
+            "cache_documents": cache_documents,
+            "response_archive": open_response_archive(stack, record_to, replay_from),
+            "rate_limiter": rate_limiter,
+        }
+        context_options: dict[str, Any] = {
+            **configure_options,
+            "proxy": proxy,
+            "local_storage": local_storage,
+            "user_agent": user_agent,
+            "viewport": viewport,
+            "enable_clipboard": enable_clipboard,
+        }
 
-        if cookies:
-            await ctx.add_cookies(cookies)
+        if browser_pool:
+            ctx, warm_page = await stack.enter_async_context(
+                browser_pool.lease_context(stealth=stealth, **context_options)
+            )
+        else:
+            p = await stack.enter_async_context(async_playwright())
+            browser_type = browser_type or "chromium"
+            browser = await (
+                p.chromium.connect_over_cdp(endpoint_url=cdp_endpoint)
+                if cdp_endpoint
+                else launch_browser(p, browser_type, headless, launch_args, extensions)
+            )
+            stack.push_async_callback(browser.close)
 
-        if abort_unnecessary_requests:
-            await ctx.route("**/*", UnnecessaryResourceHandler().handle)
+            if attach_to_existing_context and browser.contexts:
+                ctx = browser.contexts[-1]
+                await configure_context(ctx, **configure_options)
+            else:
+                ctx = await create_context(browser, **context_options)
+            stack.push_async_callback(ctx.close)
 
         async def page_factory(*_: Any, **__: Any) -> PlaywrightPage:
+            nonlocal warm_page
+
+            if warm_page:
+                # Leased from the pool with stealth already applied
+                page, warm_page = warm_page, None
+                if on_new_page:
+                    await on_new_page(page)
+                return page  # type: ignore
+
             page = (
                 ctx.pages[-1]
                 if attach_to_existing_page and ctx.pages
                 else await ctx.new_page()
             )
+            await block_requests(page, abort_unnecessary_requests, blocking_mode)
 
             if on_new_page:
                 await on_new_page(page)
@@ -154,9 +150,5 @@ async def playwright_harness(
                 await on_start(ctx)
             yield page_factory
         finally:
-            try:
-                if on_end:
-                    await on_end(ctx)
-            finally:
-                await ctx.close()
-                await browser.close()
+            if on_end:
+                await on_end(ctx)
@@ -0,0 +1,350 @@
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Optional, Self, Sequence, cast
+
+from playwright.async_api import (
+    Browser,
+    BrowserContext,
+    Page,
+    Playwright,
+    async_playwright,
+)
+
+from harambe.contrib.playwright.context import context_key, create_context, create_page
+from harambe.handlers import BlockingMode
+from harambe.types import BrowserType
+
+
+async def launch_browser(
+    p: Playwright,
+    browser_type: BrowserType = "chromium",
+    headless: bool = True,
+    launch_args: Sequence[str] = (),
+    extensions: Sequence[str] = (),
+) -> Browser:
+    extension_args = []
+    if extensions and browser_type == "chromium":
+        extension_paths = ",".join(extensions)
+        extension_args.extend(
+            [
+                f"--disable-extensions-except={extension_paths}",
+                f"--load-extension={extension_paths}",
+            ]
+        )
+
+    return await getattr(p, cast(str, browser_type)).launch(
+        headless=headless,
+        args=[
+            *launch_args,
+            *extension_args,
+            *(
+                # Disables navigator.webdriver showing up
+                ["--disable-blink-features=AutomationControlled"]
+                if browser_type == "chromium"
+                else []
+            ),
+            *(
+                # New chromium headless mode
+                ["--headless=new"] if headless else []
+            ),
+        ],
+    )
+
+
+# Options holding objects that belong to a single run, a context created with them can't be reused
+_PER_RUN_OPTIONS = ("response_archive", "rate_limiter", "response_cache")
+
+
+def _page_options(options: dict[str, Any]) -> tuple[bool, BlockingMode]:
+    return (
+        options.get("abort_unnecessary_requests", True),
+        options.get("blocking_mode", "route"),
+    )
+
+
+class _PooledBrowser:
+    def __init__(self) -> None:
+        self.browser: Optional[Browser] = None
+        self.uses = 0
+        self.active = 0
+        self.retiring = False
+        # Held while the browser is being replaced so that concurrent leases relaunch it only once
+        self.lock = asyncio.Lock()
+
+    @property
+    def healthy(self) -> bool:
+        return self.browser is not None and self.browser.is_connected()
+
+
+class BrowserPool:
+    """
+    Pool of long-lived browsers shared across `SDK.run` calls so that jobs don't pay for launching a browser.
+    Pass it to the playwright harness with `browser_pool=pool`, each run then leases a browser and only
+    creates (and closes) its own context.
+
+    - At most `contexts_per_browser` runs share a browser at the same time, further leases wait.
+    - Browsers are relaunched once they have been leased `max_uses` times and their last lease ends.
+    - Browsers that crash or disconnect are relaunched on their next lease.
+    - With `warm_contexts`, that many configured contexts (with a page open) are kept ready for every set
+      of context options passed to `warm`, and replenished in the background as they are used. Leases with
+      other options create their own context.
+
+    :example:
+        >>> async with BrowserPool(size=2, contexts_per_browser=4) as pool:
+        >>>     await SDK.run(scraper, url, browser_pool=pool)
+    """
+
+    def __init__(
+        self,
+        size: int = 1,
+        contexts_per_browser: int = 4,
+        max_uses: int = 100,
+        warm_contexts: int = 0,
+        *,
+        browser_type: BrowserType = "chromium",
+        headless: bool = True,
+        launch_args: Sequence[str] = (),
+        extensions: Sequence[str] = (),
+    ) -> None:
+        self._slots = [_PooledBrowser() for _ in range(size)]
+        self._contexts_per_browser = contexts_per_browser
+        self._max_uses = max_uses
+        self._warm_contexts = warm_contexts
+        self._warm: dict[str, list[tuple[Browser, BrowserContext, Page]]] = defaultdict(
+            list
+        )
+        self._warming: dict[str, int] = defaultdict(int)
+        self._warm_options: dict[str, dict[str, Any]] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._launch_options: dict[str, Any] = {
+            "browser_type": browser_type,
+            "headless": headless,
+            "launch_args": launch_args,
+            "extensions": extensions,
+        }
+        self._playwright: Optional[Playwright] = None
+        self._playwright_manager: Any = None
+        self._available = asyncio.Condition()
+
+    async def start(self) -> Self:
+        if self._playwright is None:
+            self._playwright_manager = async_playwright()
+            self._playwright = await self._playwright_manager.start()
+        await asyncio.gather(
+            *(self._relaunch_if(slot, lambda s: not s.healthy) for slot in self._slots)
+        )
+        return self
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._warm.clear()
+
+        await asyncio.gather(
+            *(
+                slot.browser.close()
+                for slot in self._slots
+                if slot.browser is not None and slot.browser.is_connected()
+            ),
+            return_exceptions=True,
+        )
+        for slot in self._slots:
+            slot.browser = None
+
+        if self._playwright_manager is not None:
+            await self._playwright_manager.__aexit__(None, None, None)
+            self._playwright = self._playwright_manager = None
+
+    async def __aenter__(self) -> Self:
+        return await self.start()
+
+    async def __aexit__(self, *_: Any) -> None:
+        await self.close()
+
+    async def _launch(self) -> Browser:
+        if self._playwright is None:
+            raise RuntimeError("BrowserPool has not been started")
+        return await launch_browser(self._playwright, **self._launch_options)
+
+    async def _relaunch(self, slot: _PooledBrowser) -> None:
+        old, slot.browser = slot.browser, None
+        # Warm contexts don't outlive their browser
+        stale = [key for key in self._warm if self._drop_warm(key, old)]
+        if old is not None and old.is_connected():
+            await old.close()
+
+        slot.browser = await self._launch()
+        slot.uses = 0
+        slot.retiring = False
+        for key in stale:
+            self._replenish(key)
+
+    async def _relaunch_if(
+        self, slot: _PooledBrowser, needed: Callable[[_PooledBrowser], bool]
+    ) -> None:
+        """Relaunch the browser of `slot` if it is still `needed` once no other relaunch is in progress"""
+        async with slot.lock:
+            if needed(slot):
+                await self._relaunch(slot)
+
+    def _has_warm(self, key: Optional[str], slot: _PooledBrowser) -> bool:
+        return key is not None and any(
+            browser is slot.browser for browser, _, _ in self._warm.get(key, ())
+        )
+
+    def _pick(self, key: Optional[str] = None) -> Optional[_PooledBrowser]:
+        candidates = [
+            slot
+            for slot in self._slots
+            if not slot.retiring and slot.active < self._contexts_per_browser
+        ]
+        if not candidates:
+            return None
+
+        # Prefer browsers holding a warm context for the key, then the least busy one
+        return min(
+            candidates, key=lambda slot: (not self._has_warm(key, slot), slot.active)
+        )
+
+    @asynccontextmanager
+    async def _lease_slot(
+        self, key: Optional[str] = None
+    ) -> AsyncIterator[_PooledBrowser]:
+        async with self._available:
+            await self._available.wait_for(lambda: self._pick(key) is not None)
+            slot = cast(_PooledBrowser, self._pick(key))
+            slot.active += 1
+            slot.uses += 1
+            if slot.uses >= self._max_uses:
+                slot.retiring = True
+
+        try:
+            await self._relaunch_if(slot, lambda s: not s.healthy)
+            yield slot
+        finally:
+            slot.active -= 1
+            try:
+                await self._relaunch_if(
+                    slot, lambda s: (s.retiring and s.active == 0) or not s.healthy
+                )
+            except Exception:
+                # Leave the slot empty, the next lease relaunches it
+                slot.browser = None
+                slot.retiring = False
+
+            async with self._available:
+                self._available.notify_all()
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[Browser]:
+        async with self._lease_slot() as slot:
+            yield cast(Browser, slot.browser)
+
+    @asynccontextmanager
+    async def lease_context(
+        self, stealth: bool = False, **options: Any
+    ) -> AsyncIterator[tuple[BrowserContext, Page]]:
+        """
+        Lease a context configured with `options` (see `create_context`) along with an open page,
+        taken from the warm contexts when one is available. The context is closed when the lease ends.
+        """
+        key = context_key(stealth=stealth, **options)
+
+        async with self._lease_slot(key) as slot:
+            browser = cast(Browser, slot.browser)
+            warm = self._pop_warm(key, browser)
+            if warm:
+                ctx, page = warm
+            else:
+                ctx = await create_context(browser, **options)
+                page = await create_page(ctx, stealth, *_page_options(options))
+            if key in self._warm_options:
+                self._replenish(key)
+
+            try:
+                yield ctx, page
+            finally:
+                if browser.is_connected():
+                    await ctx.close()
+
+    async def warm(self, stealth: bool = False, **options: Any) -> None:
+        """
+        Keep `warm_contexts` contexts ready for leases with the given options, starting now.
+        Options holding per run objects (`response_archive`, `rate_limiter`, `response_cache`) can't be warmed.
+        """
+        if per_run := [name for name in _PER_RUN_OPTIONS if options.get(name)]:
+            raise ValueError(f"Contexts can't be warmed with {', '.join(per_run)}")
+
+        key = context_key(stealth=stealth, **options)
+        self._warm_options[key] = {"stealth": stealth, **options}
+        await asyncio.gather(*self._replenish(key))
+
+    def _pop_warm(
+        self, key: str, browser: Browser
+    ) -> Optional[tuple[BrowserContext, Page]]:
+        entries = self._warm.get(key, [])
+        for i, (owner, ctx, page) in enumerate(entries):
+            if owner is browser and owner.is_connected():
+                del entries[i]
+                return ctx, page
+        return None
+
+    def _drop_warm(self, key: str, browser: Optional[Browser]) -> bool:
+        entries = self._warm[key]
+        kept = [entry for entry in entries if entry[0] is not browser]
+        self._warm[key] = kept
+        return len(kept) != len(entries)
+
+    def _replenish(self, key: str) -> list[asyncio.Task[None]]:
+        missing = self._warm_contexts - len(self._warm[key]) - self._warming[key]
+        tasks = []
+        for _ in range(max(missing, 0)):
+            self._warming[key] += 1
+            task = asyncio.create_task(self._warm_up(key))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            tasks.append(task)
+        return tasks
+
+    async def _warm_up(self, key: str) -> None:
+        try:
+            slots = [s for s in self._slots if s.healthy and not s.retiring]
+            if not slots:
+                return
+
+            slot = min(slots, key=lambda s: s.active)
+            browser = cast(Browser, slot.browser)
+            options = dict(self._warm_options[key])
+            stealth = options.pop("stealth")
+            ctx = await create_context(browser, **options)
+            page = await create_page(ctx, stealth, *_page_options(options))
+
+            if slot.browser is browser and browser.is_connected():
+                self._warm[key].append((browser, ctx, page))
+                async with self._available:
+                    self._available.notify_all()
+        except Exception:
+            # Warming is best effort, leases create their own context on a miss
+            pass
+        finally:
+            self._warming[key] -= 1
+
+    @property
+    def stats(self) -> list[dict[str, Any]]:
+        """Current state of every browser in the pool"""
+        return [
+            {
+                "connected": slot.healthy,
+                "active": slot.active,
+                "uses": slot.uses,
+                "retiring": slot.retiring,
+                "warm": sum(
+                    browser is slot.browser
+                    for entries in self._warm.values()
+                    for browser, _, _ in entries
+                ),
+            }
+            for slot in self._slots
+        ]
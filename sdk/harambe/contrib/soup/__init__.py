@@ -1,3 +1,4 @@
 from .harness import soup_harness
+from .selector_cache import register_selectors
 
-__all__ = ["soup_harness"]
+__all__ = ["soup_harness", "register_selectors"]
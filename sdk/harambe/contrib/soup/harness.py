@@ -1,10 +1,14 @@
-from contextlib import asynccontextmanager
+from contextlib import AsyncExitStack, asynccontextmanager
+from pathlib import Path
 from typing import Any, AsyncGenerator, Awaitable, Callable, Optional, Sequence
 
 from curl_cffi.requests import AsyncSession
 
-from harambe.contrib.soup.impl import SoupPage
+from harambe.contrib.soup.impl import SoupPage, SoupParserType
 from harambe.contrib.soup.tracing import Tracer
+from harambe.http_cache import ResponseCache
+from harambe.rate_limit import HostRateLimiter
+from harambe.replay import open_response_archive
 from harambe.types import SetCookieParam
 
 Callback = Callable[[Tracer], Awaitable[None]]
@@ -19,9 +23,30 @@ async def soup_harness(
     headers: dict[str, str] | None = None,
     on_start: Optional[Callback] = None,
     on_end: Optional[Callback] = None,
+    prefetch: bool = False,
+    response_cache: Optional[ResponseCache] = None,
+    record_to: str | Path | None = None,
+    replay_from: str | Path | None = None,
+    parser: SoupParserType = "html.parser",
+    rate_limiter: Optional[HostRateLimiter] = None,
     **__: Any,
 ) -> AsyncGenerator[PageFactory, None]:
-    async with AsyncSession(proxy=proxy, impersonate="chrome", verify=False) as s:
+    """
+    Context manager for a browserless harness backed by a `curl_cffi` session.
+    :param prefetch: fetch the next page in the background while the current page is scraped
+    when paginating with urls
+    :param response_cache: cache pages on disk following their `Cache-Control`, `ETag` and `Last-Modified`
+    headers, stale pages are revalidated with conditional requests
+    :param record_to: record every response into an archive (see `ResponseArchive`)
+    :param replay_from: serve responses from an archive instead of the network
+    :param parser: the parser backend for pages, "lxml" and "selectolax" need the `parsers` extra
+    :param rate_limiter: limit the rate of requests sent to each host, shared by every page of the harness
+    """
+    async with (
+        AsyncSession(proxy=proxy, impersonate="chrome", verify=False) as s,
+        AsyncExitStack() as stack,
+    ):
+        archive = open_response_archive(stack, record_to, replay_from)
         for c in cookies:
             s.cookies.set(
                 name=c["name"],
@@ -34,7 +59,15 @@ async def soup_harness(
         tracer = Tracer()
 
         async def factory(*_: Any, **__: Any) -> SoupPage:
-            page = SoupPage(s, tracer=tracer)
+            page = SoupPage(
+                s,
+                tracer=tracer,
+                prefetch=prefetch,
+                cache=response_cache,
+                archive=archive,
+                parser=parser,
+                rate_limiter=rate_limiter,
+            )
             if headers:
                 await page.set_extra_http_headers(headers)
             return page
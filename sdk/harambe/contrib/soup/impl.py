@@ -1,11 +1,26 @@
+import asyncio
 import json
-from typing import Any, Optional
+import time
+from collections import defaultdict
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Literal,
+    Optional,
+    Protocol,
+    cast,
+)
+from urllib.parse import urlsplit
 
 from bs4 import BeautifulSoup, Tag
 
 # noinspection PyProtectedMember
-from curl_cffi.requests import AsyncSession, HeaderTypes
+from curl_cffi.requests import AsyncSession, HeaderTypes, Headers, Response
 
+from harambe.contrib.soup.selector_cache import compile_selector
 from harambe.contrib.soup.tracing import Tracer
 from harambe.contrib.types import (
     AbstractElementHandle,
@@ -13,6 +28,16 @@ from harambe.contrib.types import (
     Selectable,
     ResponseWithStatus,
 )
+from harambe.http_cache import (
+    ResponseCache,
+    cache_key,
+    conditional_headers,
+    freshness_lifetime,
+    is_storable,
+    storable_headers,
+)
+from harambe.rate_limit import HostRateLimiter
+from harambe.replay import ResponseArchive
 
 
 class SoupElementHandle(AbstractElementHandle, Selectable["SoupElementHandle"]):
@@ -40,10 +65,10 @@ class SoupElementHandle(AbstractElementHandle, Selectable["SoupElementHandle"]):
         return self._tag.get(name)
 
     async def query_selector_all(self, selector: str) -> list["SoupElementHandle"]:
-        return self.from_tags(self._tag.select(selector))
+        return self.from_tags(compile_selector(selector).select(self._tag))
 
     async def query_selector(self, selector: str) -> Optional["SoupElementHandle"]:
-        return self.from_tag(self._tag.select_one(selector))
+        return self.from_tag(compile_selector(selector).select_one(self._tag))
 
     async def click(self) -> None:
         raise NotImplementedError()
@@ -52,6 +77,58 @@ class SoupElementHandle(AbstractElementHandle, Selectable["SoupElementHandle"]):
         pass
 
 
+SoupParserType = Literal["html.parser", "lxml", "selectolax"]
+
+
+class HTMLDocument(Protocol):
+    def select(self, selector: str) -> list[Any]: ...
+
+    def select_one(self, selector: str) -> Optional[Any]: ...
+
+    def html(self) -> str: ...
+
+    def title(self) -> Optional[str]: ...
+
+
+class BeautifulSoupDocument:
+    def __init__(self, soup: BeautifulSoup) -> None:
+        self.soup = soup
+
+    def select(self, selector: str) -> list[SoupElementHandle]:
+        return SoupElementHandle.from_tags(compile_selector(selector).select(self.soup))
+
+    def select_one(self, selector: str) -> Optional[SoupElementHandle]:
+        return SoupElementHandle.from_tag(
+            compile_selector(selector).select_one(self.soup)
+        )
+
+    def html(self) -> str:
+        return str(self.soup)
+
+    def title(self) -> Optional[str]:
+        title = self.soup.title
+        return title.string if title else None
+
+
+def parse_html(html: str, parser: SoupParserType = "html.parser") -> HTMLDocument:
+    """
+    :param html: the document to parse
+    :param parser:
+        - "html.parser": BeautifulSoup with the standard library parser
+        - "lxml": BeautifulSoup with lxml, faster to build the tree, selectors still go through soupsieve
+        - "selectolax": selectolax's lexbor engine for both parsing and selectors, the fastest option.
+          Elements are `LexborElementHandle` rather than `SoupElementHandle`
+    """
+    if parser in ("html.parser", "lxml"):
+        return BeautifulSoupDocument(BeautifulSoup(html, parser))
+    elif parser == "selectolax":
+        from harambe.contrib.soup.lexbor import LexborDocument
+
+        return LexborDocument(html)
+
+    raise ValueError(f"Unknown parser: {parser}")
+
+
 class SoupPage(AbstractPage[SoupElementHandle]):
     def __init__(
         self,
@@ -59,12 +136,25 @@ class SoupPage(AbstractPage[SoupElementHandle]):
         extra_headers: Optional[HeaderTypes] = None,
         tracer: Tracer = Tracer(),
         url: str = "about:blank",
+        prefetch: bool = False,
+        cache: Optional[ResponseCache] = None,
+        archive: Optional[ResponseArchive] = None,
+        parser: SoupParserType = "html.parser",
+        rate_limiter: Optional[HostRateLimiter] = None,
     ) -> None:
         self._session = session
         self._extra_headers = extra_headers
         self._tracer = tracer
         self._url = url
-        self._soup = BeautifulSoup("", "html.parser")
+        self._parser = parser
+        self._response: Optional[Response] = None
+        self._text: Optional[str] = None
+        self._parsed: Optional[HTMLDocument] = None
+        self._prefetch_enabled = prefetch
+        self._prefetched: dict[str, asyncio.Task[Response]] = {}
+        self._cache = cache
+        self._archive = archive
+        self._rate_limiter = rate_limiter
 
     @property
     def tracing(self) -> Tracer:
@@ -78,20 +168,212 @@ class SoupPage(AbstractPage[SoupElementHandle]):
     def url(self, value: str) -> None:
         self._url = value
 
-    async def goto(self, url: str, **kwargs: Any) -> ResponseWithStatus:
-        res = await self._session.get(
-            url, headers=self._extra_headers, impersonate="chrome"
+    def _set_response(self, res: Response) -> None:
+        self._response = res
+        self._text = None
+        self._parsed = None
+
+    @property
+    def _html(self) -> str:
+        """Text of the current response, decoded once"""
+        if self._text is None:
+            self._text = self._response.text if self._response is not None else ""
+        return self._text
+
+    @property
+    def _document(self) -> HTMLDocument:
+        """
+        The current page, parsed on first use so that scrapers that only call APIs, read the content or
+        navigate again don't pay for building the tree
+        """
+        if self._parsed is None:
+            self._parsed = parse_html(self._html, self._parser)
+        return self._parsed
+
+    @property
+    def prefetch_enabled(self) -> bool:
+        return self._prefetch_enabled
+
+    def prefetch(self, url: str) -> None:
+        """
+        Start fetching `url` in the background so that a following `goto(url)` doesn't wait on the network.
+        Only the most recent prefetch is kept.
+        """
+        if url in self._prefetched:
+            return
+
+        self._discard_prefetched()
+        task = asyncio.create_task(self._get(url))
+        # Mark failures as retrieved, a failed prefetch is retried by `goto`
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._prefetched[url] = task
+
+    def _discard_prefetched(self) -> None:
+        for task in self._prefetched.values():
+            task.cancel()
+        self._prefetched.clear()
+
+    async def _get(self, url: str) -> Response:
+        if self._archive is not None and self._archive.mode == "replay":
+            return self._replay("GET", url)
+
+        if self._cache is not None:
+            res = await self._cached_get(self._cache, url)
+        else:
+            res = await self._send(
+                url,
+                lambda: self._session.get(
+                    url, headers=self._extra_headers, impersonate="chrome"
+                ),
+            )
+
+        if self._archive is not None:
+            self._archive.record("GET", url, res.status_code, res.headers, res.content)
+        return res
+
+    async def _send(
+        self, url: str, request: Callable[[], Awaitable[Response]]
+    ) -> Response:
+        """Send a request to the network, waiting for its host's turn when there is a rate limiter"""
+        if self._rate_limiter is None:
+            return await request()
+
+        await self._rate_limiter.acquire(url)
+        start = time.monotonic()
+        res = await request()
+        self._rate_limiter.feedback(url, res.status_code, time.monotonic() - start)
+        return res
+
+    def _replay(
+        self, method: str, url: str, request_body: Optional[bytes] = None
+    ) -> Response:
+        recorded = cast(ResponseArchive, self._archive).replay(
+            method, url, request_body
         )
+        if recorded is None:
+            raise LookupError(f"No recorded response for {method} {url}")
+        return self._make_response(*recorded)
+
+    async def _cached_get(self, cache: ResponseCache, url: str) -> Response:
+        """
+        GET honoring `Cache-Control`, `ETag` and `Last-Modified`. Fresh responses are served from the cache,
+        stale ones are revalidated with a conditional request and reused when the server answers 304.
+        """
+        key = cache_key("GET", url)
+        cached = cache.get(key)
+        if cached and cached.fresh:
+            return self._make_response(url, cached.status, cached.headers, cached.body)
+
+        headers = dict(self._extra_headers or {})  # type: ignore
+        if cached:
+            headers.update(conditional_headers(cached))
+
+        res = await self._send(
+            url,
+            lambda: self._session.get(url, headers=headers, impersonate="chrome"),
+        )
+        if cached and res.status_code == 304:
+            # The 304 carries the updated freshness for the stored response
+            merged = {**cached.headers, **storable_headers(res.headers)}
+            expires_at = time.time() + freshness_lifetime(merged)
+            cached = (
+                cache.put(key, cached.status, merged, cached.body, expires_at) or cached
+            )
+            return self._make_response(url, cached.status, cached.headers, cached.body)
+
+        # Redirected responses aren't stored since the cache doesn't keep the final url
+        if res.url == url and is_storable(res.status_code, res.headers):
+            expires_at = time.time() + freshness_lifetime(res.headers)
+            cache.put(key, res.status_code, res.headers, res.content, expires_at)
+        elif cached:
+            cache.delete(key)
+        return res
+
+    @staticmethod
+    def _make_response(
+        url: str, status: int, headers: dict[str, str], body: bytes
+    ) -> Response:
+        """Response built from a cached or recorded one, without going through the session"""
+        res = Response()
+        res.url = url
+        res.status_code = status
+        res.headers = Headers(headers)
+        res.content = body
+        return res
+
+    async def _fetch(self, url: str) -> Response:
+        task = self._prefetched.pop(url, None)
+        self._discard_prefetched()
+        if task is not None:
+            try:
+                return await task
+            except Exception:
+                pass  # Retry the request below so errors surface from the navigation itself
+
+        return await self._get(url)
+
+    async def goto(self, url: str, **kwargs: Any) -> ResponseWithStatus:
+        res = await self._fetch(url)
         self._tracer.log_request(res)
         self._url = res.url
-        self._soup = BeautifulSoup(res.text, "html.parser")
+        self._set_response(res)
 
         class SoupResponseWithStatus:
             status: int = res.status_code
-            headers: dict[str, str] = res.headers
+            headers: dict[str, str] = cast(dict[str, str], res.headers)
 
         return SoupResponseWithStatus()
 
+    def _sibling(self) -> "SoupPage":
+        """A blank page sharing this page's session, headers and options"""
+        return SoupPage(
+            self._session,
+            self._extra_headers,
+            self._tracer,
+            cache=self._cache,
+            archive=self._archive,
+            parser=self._parser,
+            rate_limiter=self._rate_limiter,
+        )
+
+    async def goto_many(
+        self, urls: Iterable[str], concurrency: int = 8, per_host: int = 4
+    ) -> AsyncIterator["SoupPage"]:
+        """
+        Fetch `urls` concurrently on this page's session and yield a new page for each of them as soon as
+        it has loaded, in completion order. Duplicate urls are fetched once and this page itself is left
+        untouched.
+
+        Requests to the same host go through the session's connections, which curl multiplexes over
+        HTTP/2 when the server negotiates it. Pages are yielded whatever their status, a failed request
+        cancels the remaining ones and is raised. So does closing the generator early, wrap it in
+        `contextlib.aclosing` to do so as soon as the loop is left.
+
+        :param concurrency: maximum number of requests in flight
+        :param per_host: maximum number of requests in flight to a single host
+        """
+        in_flight = asyncio.Semaphore(concurrency)
+        hosts: dict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(per_host)
+        )
+
+        async def load(url: str) -> SoupPage:
+            # Wait on the host first so that a busy host doesn't hold slots other hosts could use
+            async with hosts[urlsplit(url).netloc], in_flight:
+                page = self._sibling()
+                await page.goto(url)
+                return page
+
+        tasks = [asyncio.create_task(load(url)) for url in dict.fromkeys(urls)]
+        try:
+            for loaded in asyncio.as_completed(tasks):
+                yield await loaded
+        finally:
+            # The consumer may stop early, wait for the remaining requests to wind down
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
     async def post(
         self,
         url: str,
@@ -99,13 +381,29 @@ class SoupPage(AbstractPage[SoupElementHandle]):
         headers: Optional[HeaderTypes] = None,
         **kwargs: Any,
     ) -> Any:
-        res = await self._session.post(
-            url,
-            headers=headers or self._extra_headers,
-            data=json.dumps(data),
-            impersonate="chrome",
-            **kwargs,
-        )
+        body = json.dumps(data)
+        if self._archive is not None and self._archive.mode == "replay":
+            res = self._replay("POST", url, body.encode())
+        else:
+            res = await self._send(
+                url,
+                lambda: self._session.post(
+                    url,
+                    headers=headers or self._extra_headers,
+                    data=body,
+                    impersonate="chrome",
+                    **kwargs,
+                ),
+            )
+            if self._archive is not None:
+                self._archive.record(
+                    "POST",
+                    url,
+                    res.status_code,
+                    res.headers,
+                    res.content,
+                    body.encode(),
+                )
         if self._tracer:
             self._tracer.log_request(res)
 
@@ -120,7 +418,7 @@ class SoupPage(AbstractPage[SoupElementHandle]):
 
             return SoupResponseWithStatus()
 
-        self._soup = BeautifulSoup(res.text, "html.parser")
+        self._set_response(res)
 
         class SoupResponseWithStatus:
             status: int = res.status_code
@@ -129,10 +427,10 @@ class SoupPage(AbstractPage[SoupElementHandle]):
         return SoupResponseWithStatus()
 
     async def query_selector_all(self, selector: str) -> list[SoupElementHandle]:
-        return SoupElementHandle.from_tags(self._soup.select(selector))
+        return self._document.select(selector)
 
     async def query_selector(self, selector: str) -> SoupElementHandle | None:
-        return SoupElementHandle.from_tag(self._soup.select_one(selector))
+        return self._document.select_one(selector)
 
     def locator(self, selector: str) -> "SoupLocator":
         return SoupLocator(selector, self)
@@ -147,7 +445,8 @@ class SoupPage(AbstractPage[SoupElementHandle]):
         pass
 
     async def content(self) -> str:
-        return str(self._soup)
+        # Always the response as received, serializing the parsed document could normalize the markup
+        return self._html
 
     async def text_content(self, selector: str, **kwargs: Any) -> str | None:
         if el := await self.query_selector(selector):
@@ -168,10 +467,7 @@ class SoupPage(AbstractPage[SoupElementHandle]):
         pass
 
     async def title(self) -> str | None:
-        title = self._soup.title
-        if title:
-            return title.string
-        return None
+        return self._document.title()
 
 
 class SoupLocator:
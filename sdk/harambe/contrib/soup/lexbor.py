@@ -0,0 +1,62 @@
+from typing import Any, Optional
+
+from selectolax.lexbor import LexborHTMLParser, LexborNode
+
+from harambe.contrib.types import AbstractElementHandle, Selectable
+
+
+class LexborElementHandle(AbstractElementHandle, Selectable["LexborElementHandle"]):
+    """`SoupElementHandle` counterpart for documents parsed with selectolax's lexbor backend"""
+
+    def __init__(self, node: LexborNode) -> None:
+        self._node = node
+
+    @classmethod
+    def from_node(cls, node: LexborNode | None) -> Optional["LexborElementHandle"]:
+        return cls(node) if node else None
+
+    @classmethod
+    def from_nodes(cls, nodes: list[LexborNode]) -> list["LexborElementHandle"]:
+        return [cls(n) for n in nodes]
+
+    async def inner_text(self) -> str:
+        return self._node.text(deep=True)
+
+    async def inner_html(self) -> str:
+        return self._node.inner_html or ""
+
+    async def text_content(self) -> str:
+        return await self.inner_text()
+
+    async def get_attribute(self, name: str) -> str:
+        return self._node.attributes.get(name)  # type: ignore
+
+    async def query_selector_all(self, selector: str) -> list["LexborElementHandle"]:
+        return self.from_nodes(self._node.css(selector))
+
+    async def query_selector(self, selector: str) -> Optional["LexborElementHandle"]:
+        return self.from_node(self._node.css_first(selector))
+
+    async def click(self) -> None:
+        raise NotImplementedError()
+
+    async def wait_for_selector(self, selector: str, **kwargs: Any) -> None:
+        pass
+
+
+class LexborDocument:
+    def __init__(self, html: str) -> None:
+        self._parser = LexborHTMLParser(html)
+
+    def select(self, selector: str) -> list[LexborElementHandle]:
+        return LexborElementHandle.from_nodes(self._parser.css(selector))
+
+    def select_one(self, selector: str) -> Optional[LexborElementHandle]:
+        return LexborElementHandle.from_node(self._parser.css_first(selector))
+
+    def html(self) -> str:
+        return self._parser.html or ""
+
+    def title(self) -> Optional[str]:
+        title = self._parser.css_first("title")
+        return title.text() if title else None
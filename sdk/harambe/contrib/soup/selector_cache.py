@@ -0,0 +1,33 @@
+from functools import lru_cache
+
+import soupsieve
+from soupsieve import SoupSieve
+
+SELECTOR_CACHE_SIZE = 1024
+
+_registered: dict[str, SoupSieve] = {}
+
+
+@lru_cache(maxsize=SELECTOR_CACHE_SIZE)
+def _compile(selector: str) -> SoupSieve:
+    return soupsieve.compile(selector)
+
+
+def compile_selector(selector: str) -> SoupSieve:
+    """
+    Compiled form of a CSS selector, cached so that selectors used for every row of every page are only
+    parsed once. Registered selectors are never evicted, others are kept in an LRU cache.
+    """
+    if compiled := _registered.get(selector):
+        return compiled
+    return _compile(selector)
+
+
+def register_selectors(*selectors: str) -> None:
+    """
+    Compile selectors ahead of time, typically at scraper definition, so that they are never evicted
+    from the cache and invalid selectors fail on import rather than mid scrape.
+    """
+    for selector in selectors:
+        if selector not in _registered:
+            _registered[selector] = soupsieve.compile(selector)
@@ -1,6 +1,6 @@
 import asyncio
+import copy
 import inspect
-import tempfile
 import uuid
 from functools import wraps
 from pathlib import Path
@@ -8,6 +8,7 @@ from typing import (
     Any,
     Awaitable,
     Callable,
+    Iterable,
     List,
     Optional,
     Protocol,
@@ -23,6 +24,7 @@ from harambe_core import Schema, SchemaParser
 from harambe_core.errors import default_error_callback
 from harambe_core.normalize_url import normalize_url
 from harambe_core.observer import (
+    DownloadedFile,
     DownloadMeta,
     HTMLMetadata,
     LocalStorageObserver,
@@ -30,6 +32,7 @@ from harambe_core.observer import (
     ObservationTrigger,
     OutputObserver,
 )
+from harambe_core.observer.download import DEFAULT_MAX_IN_MEMORY
 from harambe_core.parser.expression import ExpressionEvaluator
 from playwright.async_api import (
     ElementHandle,
@@ -42,14 +45,18 @@ from playwright.async_api import (
 from harambe.cache import single_value_cache
 from harambe.contrib import WebHarness, playwright_harness
 from harambe.contrib.soup.impl import SoupPage
+from harambe.contrib.soup.selector_cache import register_selectors
 from harambe.contrib.types import AbstractPage
 from harambe.cookie_utils import fix_cookie
 from harambe.handlers import (
+    ResourceBlockingPolicy,
     ResourceRequestHandler,
     ResourceType,
 )
 from harambe.html_converter import HTMLConverterType, get_html_converter
-from harambe.pagination import DuplicateHandler
+from harambe.pagination import DuplicateHandler, resolve_next_page_url
+from harambe.readiness import ReadinessStrategy, wait_until_ready
+from harambe.retry import CircuitBreaker, RetryPolicy, goto_with_retry
 from harambe.tracker import FileDataTracker
 from harambe.types import (
     URL,
@@ -98,6 +105,7 @@ class SDK:
         schema: Optional[Schema] = None,
         deduper: Optional[DuplicateHandler] = None,
         evaluator: Optional[ExpressionEvaluator] = None,
+        page_factory: Optional[Callable[[], Awaitable[AbstractPage[Any]]]] = None,
     ):
         self.page: Page = page  # type: ignore
         self._id = run_id or uuid.uuid4()
@@ -118,12 +126,24 @@ class SDK:
 
         self._observers = observer
         self._deduper = deduper if deduper else DuplicateHandler()
+        self._paginating = False
+        self._pages_visited = 0
+        self._next_page_url: Optional[URL] = None
+        self._next_page_getter: Optional[
+            Callable[..., Awaitable[URL | ElementHandle | None]]
+        ] = None
+        # Result of the pager call made to prefetch the next page, used by the next `paginate` call
+        self._prefetched_next_page: Optional[tuple[URL | ElementHandle | None]] = None
+        self._page_factory = page_factory
+        self._in_page_range = False
 
     async def save_data(
         self, *data: ScrapeResult, source_url: Optional[str] = None
     ) -> None:
         """
-        Save scraped data and validate its type matches the current schema
+        Save scraped data and validate its type matches the current schema.
+        If the SDK's `DuplicateHandler` has a content index, rows that are unchanged since the last run
+        (by `$primary_key`) are skipped and the rest are tagged with `__change` as "new" or "changed".
 
         :param data: Rows of data (as dictionaries) to save
         :param source_url: Optional URL to associate with the data, defaults to current page URL. Only use this if the source of the data is different than the current page when the data is saved
@@ -194,6 +214,9 @@ class SDK:
         self,
         get_next_page_element: Callable[..., Awaitable[URL | ElementHandle | None]],
         timeout: int = 2000,
+        max_pages: Optional[int] = None,
+        wait_strategy: ReadinessStrategy = "timeout",
+        ready_selector: Optional[str] = None,
     ) -> None:
         """
         SDK method to automatically facilitate paginating a list of elements.
@@ -207,48 +230,243 @@ class SDK:
 
         This method should ALWAYS be used for pagination instead of manual for loops and if statements.
 
+        Pages are scraped in a loop driven by the first call rather than recursively. Code placed after
+        `await sdk.paginate(...)` in the scraper therefore runs after every later page has been scraped for
+        the first page only. For the other pages it runs as soon as the next page has been navigated to,
+        before that page is scraped, so `sdk.page` already shows the next page there.
+
         :param get_next_page_element: the url or ElementHandle of the next page
-        :param timeout: milliseconds to sleep for before continuing. Only use if there is no other wait option
+        :param timeout: milliseconds to sleep for before continuing. Only use if there is no other wait option.
+        With any other `wait_strategy` this is the maximum time to wait for the next page to be ready
+        :param max_pages: optional maximum number of pages to scrape, including the first page
+        :param wait_strategy: how to detect that the next page is ready, one of "timeout" (sleep for `timeout` ms),
+        "network_idle", "dom_quiet", "selector" (wait for `ready_selector`) or "url_change"
+        :param ready_selector: selector that appears once the next page is ready, used by the "selector" strategy
 
         :example:
             >>> async def pager():
             >>>     return await page.query_selector("div.pagination > .pager.next")
             >>>
             >>> await sdk.paginate(pager)
+            >>> await sdk.paginate(pager, wait_strategy="selector", ready_selector="table tbody tr")
         """
+        if self._in_page_range:
+            # Pages scraped by `paginate_range` are already being paginated
+            return
+
+        # The first call drives a loop that runs the scraper for every following page. The calls made
+        # by those scraper runs only navigate and hand the next url back to the loop, so the
+        # stack depth stays constant regardless of the number of pages
+        driving = not self._paginating
+        if driving:
+            self._pages_visited = 1
+
         try:
-            next_page = await get_next_page_element()
-            if not next_page:
+            if max_pages is not None and self._pages_visited >= max_pages:
                 return
 
-            next_url = ""
-            if isinstance(next_page, ElementHandle):
-                await next_page.click(timeout=timeout)
-                await self.page.wait_for_timeout(timeout)
-                next_url = self.page.url
-
-            elif isinstance(next_page, str):
-                next_url = next_page
-                if next_url.startswith("?"):
-                    # TODO: merge query params
-                    next_url = self.page.url.split("?")[0] + next_url
-
-                await self.page.goto(normalize_url(next_url, self.page.url))
-                await self.page.wait_for_timeout(timeout)
-
-            if next_url:
-                await self._notify_observers("on_paginate", next_url)
-                if not self._scraper:
-                    return
-                await self._scraper(
-                    self, next_url, self._context
-                )  # TODO: eventually fix this to not be recursive
+            next_url = await self._go_to_next_page(
+                get_next_page_element, timeout, wait_strategy, ready_selector
+            )
+            if not next_url or not self._scraper:
+                return
+
+            self._pages_visited += 1
+            self._next_page_getter = get_next_page_element
+            if not driving:
+                self._next_page_url = next_url
+                return
+
+            self._paginating = True
+            while next_url:
+                self._next_page_url = None
+                self._prefetched_next_page = None
+                # The last page allowed by `max_pages` has no next page to fetch
+                if max_pages is None or self._pages_visited < max_pages:
+                    await self._prefetch_next_page()
+                await self._scraper(self, next_url, self._context)
+                next_url = self._next_page_url
         except PlaywrightTimeoutError as e:
             raise TimeoutError(
                 f"{e.args[0]} You may increase the timeout by passing `timeout` in ms to `SDK.paginate`. Alternatively, this may mean that the next page element or URL was not found and pagination is complete."
             ) from e
         except (TimeoutError, AttributeError, StopAsyncIteration):
             return
+        finally:
+            if driving:
+                self._paginating = False
+                self._prefetched_next_page = None
+
+    async def paginate_range(
+        self,
+        url_template: str,
+        pages: Iterable[int],
+        concurrency: int = 4,
+        *,
+        retry: Optional[RetryPolicy] = None,
+        goto_error_handler: Callable[
+            [str, int, dict[str, str]], Awaitable[None]
+        ] = default_error_callback,
+    ) -> None:
+        """
+        Scrape listings whose pages have predictable urls (eg: `?page=2`) concurrently instead of
+        clicking through them one at a time. Each page number is formatted into `url_template` and the
+        scraper is run against it on one of `concurrency` pages created by the harness.
+        Calls to `sdk.paginate` and `sdk.paginate_range` within those scraper runs are ignored. Pages that
+        still respond with an error status after `retry` are passed to `goto_error_handler`, which raises
+        a `GotoError` by default and stops the other pages. Rows from different pages may be saved in any order.
+
+        :param url_template: url of a page with `{}` in place of the page number, can be relative
+        :param pages: the page numbers to scrape, typically excluding the current page
+        :param concurrency: the maximum number of pages to scrape at once
+        :param retry: retry the navigation to each page on timeouts, network errors and 429/5xx responses
+        :param goto_error_handler: called with the url, status and headers of pages that failed, the page is
+        skipped when it returns
+
+        :example:
+            >>> total = int(await sdk.page.inner_text(".pagination .last"))
+            >>> await sdk.paginate_range("/products?page={}", range(2, total + 1))
+        """
+        if self._in_page_range:
+            # The scraper runs of the pages in the range call this again, they must not fan out themselves
+            return
+        if not self._scraper:
+            raise RuntimeError("SDK.paginate_range requires a scraper")
+        if self._page_factory is None:
+            raise RuntimeError(
+                "SDK.paginate_range requires a page factory, run the scraper with SDK.run"
+            )
+
+        page_factory = self._page_factory
+        idle_pages: asyncio.Queue[AbstractPage[Any]] = asyncio.Queue()
+        created_pages: list[AbstractPage[Any]] = []
+        forks: list[DuplicateHandler] = []
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def acquire_page() -> AbstractPage[Any]:
+            if idle_pages.empty():
+                page = await page_factory()
+                created_pages.append(page)
+                return page
+            return idle_pages.get_nowait()
+
+        async def scrape(number: int) -> None:
+            async with semaphore:
+                page = await acquire_page()
+                try:
+                    url = normalize_url(url_template.format(number), self.page.url)
+                    response = await goto_with_retry(page, url, retry)
+                    if response.status >= 400:
+                        await goto_error_handler(url, response.status, response.headers)
+                        return
+
+                    deduper = self._deduper.fork(number)
+                    forks.append(deduper)
+                    await self._notify_observers(
+                        "on_paginate", url, check_duplication=False
+                    )
+                    await self._scraper(  # type: ignore
+                        self._for_page_in_range(page, deduper), url, self._context
+                    )
+                finally:
+                    idle_pages.put_nowait(page)
+
+        current_page = cast(AbstractPage[Any], self.page)
+        tasks = [asyncio.create_task(scrape(number)) for number in pages]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            # Stop the other pages when one fails so that their pages aren't closed under them
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+            self._deduper.join(forks)
+            for page in created_pages:
+                if page is not current_page and (close := getattr(page, "close", None)):
+                    await close()
+
+    def _for_page_in_range(
+        self, page: AbstractPage[Any], deduper: DuplicateHandler
+    ) -> "SDK":
+        sdk = copy.copy(self)
+        sdk.page = page  # type: ignore
+        sdk._deduper = deduper
+        sdk._in_page_range = True
+        return sdk
+
+    async def _go_to_next_page(
+        self,
+        get_next_page_element: Callable[..., Awaitable[URL | ElementHandle | None]],
+        timeout: int,
+        wait_strategy: ReadinessStrategy,
+        ready_selector: Optional[str],
+    ) -> URL | None:
+        """
+        Navigate to the next page and notify observers
+        :return: the url of the next page or None if there is no next page
+        """
+        if self._prefetched_next_page is not None:
+            # The pager already ran for this page when prefetching, calling it again would skip a
+            # page with pagers that keep a counter
+            (next_page,), self._prefetched_next_page = self._prefetched_next_page, None
+        else:
+            next_page = await get_next_page_element()
+        if not next_page:
+            return None
+
+        next_url = ""
+        previous_url = self.page.url
+        if isinstance(next_page, ElementHandle):
+            await next_page.click(timeout=timeout)
+            await wait_until_ready(
+                self.page,
+                wait_strategy,
+                timeout=timeout,
+                previous_url=previous_url,
+                selector=ready_selector,
+            )
+            next_url = self.page.url
+
+        elif isinstance(next_page, str):
+            next_url = next_page
+            await self.page.goto(self._resolve_next_url(next_url))
+            await wait_until_ready(
+                self.page,
+                wait_strategy,
+                timeout=timeout,
+                previous_url=previous_url,
+                selector=ready_selector,
+            )
+
+        if not next_url:
+            return None
+
+        await self._notify_observers("on_paginate", next_url)
+        return next_url
+
+    def _resolve_next_url(self, next_url: str) -> URL:
+        return resolve_next_page_url(self.page.url, next_url)
+
+    async def _prefetch_next_page(self) -> None:
+        """
+        When the soup harness is prefetching, look up the url of the page after the current one and start
+        fetching it, so the request overlaps with the scraper validating and saving the current page
+        """
+        page = self.page
+        if not isinstance(page, SoupPage) or not page.prefetch_enabled:
+            return
+        if self._next_page_getter is None:
+            return
+
+        try:
+            upcoming = await self._next_page_getter()
+            self._prefetched_next_page = (upcoming,)
+            if isinstance(upcoming, str):
+                page.prefetch(self._resolve_next_url(upcoming))
+        except Exception:
+            # Prefetching is best effort, `paginate` will surface any error
+            pass
 
     async def capture_url(
         self,
@@ -280,6 +498,7 @@ class SDK:
         override_filename: str | None = None,
         override_url: str | None = None,
         timeout: float | None = None,
+        max_in_memory: int = DEFAULT_MAX_IN_MEMORY,
     ) -> DownloadMeta:
         """
         Capture a download event that gets triggered by clicking an element. This method will:
@@ -290,30 +509,47 @@ class SDK:
 
         Use this method to manually download dynamic files or files that can only be downloaded in the current browser session.
 
+        Observers implementing `on_download_file` get the file the browser saved (see `DownloadedFile`) and can
+        use its path or stream it, the others get its content through `on_download`. The browser deletes the
+        file when its context closes.
+
+        :param max_in_memory: downloads up to this many bytes are read from disk once and shared by the observers
         :return DownloadMeta: A typed dict containing the download metadata such as the `url` and `filename`
         """
 
         async with self.page.expect_download(timeout=timeout) as download_info:
             await clickable.click()
         download = await download_info.value
-        path = str(await download.path())
+        file = DownloadedFile(await download.path(), max_in_memory)
 
-        # Create a temporary file to save the download
-        with tempfile.NamedTemporaryFile() as temp_file:
-            await download.save_as(temp_file.name)
-            with open(temp_file.name, "rb") as f:
-                content = f.read()
-
-        res = await self._notify_observers(
-            "on_download",
+        res = await self._notify_download(
             override_url if override_url else download.url,
             override_filename if override_filename else download.suggested_filename,
-            content,
-            path,
-            check_duplication=False,
+            file,
         )
         return res[0]
 
+    async def _notify_download(
+        self, download_url: str, filename: str, file: DownloadedFile
+    ) -> list[DownloadMeta]:
+        content: Optional[asyncio.Future[bytes]] = None
+
+        async def read() -> bytes:
+            # Legacy observers share one read, even of files too large for `DownloadedFile` to keep
+            nonlocal content
+            if content is None:
+                content = asyncio.ensure_future(file.read())
+            return await content
+
+        async def notify(observer: OutputObserver) -> DownloadMeta:
+            if hasattr(observer, "on_download_file"):
+                return await observer.on_download_file(download_url, filename, file)
+            return await observer.on_download(
+                download_url, filename, await read(), str(file.path)
+            )
+
+        return await asyncio.gather(*[notify(o) for o in self._observers])
+
     async def capture_html(
         self,
         selector: str = "html",
@@ -391,19 +627,30 @@ class SDK:
 
     async def capture_pdf(
         self,
+        wait_strategy: ReadinessStrategy = "timeout",
+        timeout: int = 1000,
+        ready_selector: Optional[str] = None,
     ) -> DownloadMeta:
         """
         Capture the current page as a pdf and then apply some download handling logic
         from the observer to transform to a usable URL
 
+        :param wait_strategy: how to detect that the page is ready to be captured, see `SDK.paginate`
+        :param timeout: milliseconds to sleep for, or the maximum time to wait with any other `wait_strategy`
+        :param ready_selector: selector that appears once the page is ready, used by the "selector" strategy
         :return DownloadMeta: A typed dict containing the download metadata such as the `url` and `filename`
         :example:
             >>> meta = await sdk.capture_pdf()
             >>> await sdk.save_data({"file_name": meta["filename"], "download_url": meta["url"]})
         """
-        await self.page.wait_for_timeout(
-            1000
-        )  # Allow for some extra time for the page to load
+        # Allow for some extra time for the page to load
+        await wait_until_ready(
+            self.page,
+            wait_strategy,
+            timeout=timeout,
+            previous_url=self.page.url,
+            selector=ready_selector,
+        )
         pdf_content = await self.page.pdf()
         file_name = PAGE_PDF_FILENAME
         res = await self._notify_observers(
@@ -516,6 +763,9 @@ class SDK:
         goto_error_handler: Callable[
             [str, int, dict[str, str]], Awaitable[None]
         ] = default_error_callback,
+        deduper: Optional[DuplicateHandler] = None,
+        retry: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
         **harness_options: Unpack[HarnessOptions],
     ) -> "SDK":
         """
@@ -529,6 +779,11 @@ class SDK:
         :param harness: the harness to use for the browser
         :param evaluator: expression evaluator to use for the scraper
         :param observer: observer to use for the scraper
+        :param deduper: duplicate handler to use, pass one backed by a `SqliteDedupStore` for incremental crawls
+        :param retry: retry the navigation to `url` on timeouts, network errors and 429/5xx responses,
+        `goto_error_handler` only sees the last response
+        :param circuit_breaker: skip the navigation with a `CircuitOpenError` while the host keeps failing,
+        share it between the runs of a batch
         :return none: everything should be saved to the database or file
         """
         domain = getattr(scraper, "domain", None)
@@ -537,6 +792,9 @@ class SDK:
         context = context or {}
 
         harness_options.setdefault("headers", getattr(scraper, "extra_headers", None))  # type: ignore
+        harness_options.setdefault(
+            "resource_blocking", getattr(scraper, "resource_blocking", None)
+        )
 
         if isinstance(url, Path):
             url = f"file://{url.resolve()}"
@@ -551,18 +809,23 @@ class SDK:
                 scraper=scraper,
                 context=context,
                 schema=schema,
+                deduper=deduper,
                 evaluator=evaluator,
+                page_factory=page_factory,
             )
-            if setup:
-                await setup(sdk)
+            try:
+                if setup:
+                    await setup(sdk)
 
-            if not harness_options.get("disable_go_to_url", False):
-                response = await page.goto(url)
-                if response.status >= 400:
-                    await goto_error_handler(url, response.status, response.headers)
-            elif isinstance(page, SoupPage):
-                page.url = url
-            await scraper(sdk, url, context)
+                if not harness_options.get("disable_go_to_url", False):
+                    response = await goto_with_retry(page, url, retry, circuit_breaker)
+                    if response.status >= 400:
+                        await goto_error_handler(url, response.status, response.headers)
+                elif isinstance(page, SoupPage):
+                    page.url = url
+                await scraper(sdk, url, context)
+            finally:
+                sdk._deduper.flush()
 
         return sdk
 
@@ -633,6 +896,7 @@ class SDK:
                     observer=observer,
                     scraper=scraper,
                     schema=schema,
+                    page_factory=page_factory,
                 )
                 if setup:
                     await setup(sdk)
@@ -703,5 +967,43 @@ class SDK:
 
         return decorator
 
+    @staticmethod
+    def with_resource_blocking(
+        policy: ResourceBlockingPolicy,
+    ) -> Callable[[AsyncScraperType], AsyncScraperType]:
+        """
+        Decorator for scrapers. Requests made while running the scraper are handled by the given policy
+        instead of the default one, unless `resource_blocking` is passed to `SDK.run`.
+        :param policy: the resource blocking policy to use for the scraper
+        :return: the decorated function
+        """
+
+        def decorator(func: AsyncScraperType) -> AsyncScraperType:
+            @wraps(func)
+            async def wrapper(sdk: "SDK", url: URL, context: Context) -> None:
+                return await func(sdk, url, context)
+
+            wrapper.resource_blocking = policy  # type: ignore
+            return wrapper
+
+        return decorator
+
+    @staticmethod
+    def with_selectors(
+        *selectors: str,
+    ) -> Callable[[AsyncScraperType], AsyncScraperType]:
+        """
+        Decorator for scrapers. Compiles the CSS selectors used by the scraper once, when it is defined,
+        so that soup pages don't parse them again for every row and invalid selectors fail early.
+        :param selectors: the selectors used by the scraper
+        :return: the scraper
+        """
+        register_selectors(*selectors)
+
+        def decorator(func: AsyncScraperType) -> AsyncScraperType:
+            return func
+
+        return decorator
+
 
 PAGE_PDF_FILENAME = "reworkd_page_pdf.pdf"
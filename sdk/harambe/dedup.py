@@ -0,0 +1,295 @@
+import math
+import sqlite3
+from pathlib import Path
+from typing import Literal, Optional, Protocol, runtime_checkable
+
+DedupBackend = Literal["exact", "bloom"]
+ChangeStatus = Literal["new", "changed", "unchanged"]
+
+
+@runtime_checkable
+class DedupStore(Protocol):
+    def add(self, key: bytes) -> bool:
+        """
+        Record a key
+        :param key: 16 byte digest produced by `DuplicateHandler.compute_hash`
+        :return: bool indicating if the key was already present, true if it is duplicated
+        """
+        ...
+
+    def __len__(self) -> int: ...
+
+
+class ExactDedupStore:
+    """Keeps every digest in a set. No false positives, memory grows linearly with the number of keys"""
+
+    def __init__(self) -> None:
+        self._keys: set[bytes] = set()
+
+    def add(self, key: bytes) -> bool:
+        if key in self._keys:
+            return True
+
+        self._keys.add(key)
+        return False
+
+    def __contains__(self, key: bytes) -> bool:
+        return key in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+def split_key(key: bytes) -> tuple[int, int]:
+    """Split a digest into the two base hashes used for double hashing"""
+    return int.from_bytes(key[:8], "little"), int.from_bytes(key[8:16], "little") | 1
+
+
+class BloomFilter:
+    """
+    Fixed size bloom filter sized for `capacity` keys at the given `error_rate`.
+    Keys are expected to already be uniformly distributed digests, so the bit
+    positions are derived from the key itself via double hashing.
+    """
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._count = 0
+
+    def _positions(self, h1: int, h2: int) -> list[int]:
+        m = self.num_bits
+        return [(h1 + i * h2) % m for i in range(self.num_hashes)]
+
+    def add_hashes(self, h1: int, h2: int) -> bool:
+        bits = self._bits
+        present = True
+        for pos in self._positions(h1, h2):
+            byte, mask = pos >> 3, 1 << (pos & 7)
+            if not bits[byte] & mask:
+                present = False
+                bits[byte] |= mask
+
+        if not present:
+            self._count += 1
+        return present
+
+    def contains_hashes(self, h1: int, h2: int) -> bool:
+        bits = self._bits
+        for pos in self._positions(h1, h2):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def add(self, key: bytes) -> bool:
+        return self.add_hashes(*split_key(key))
+
+    def __contains__(self, key: bytes) -> bool:
+        return self.contains_hashes(*split_key(key))
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def is_full(self) -> bool:
+        return self._count >= self.capacity
+
+    @property
+    def size_in_bytes(self) -> int:
+        return len(self._bits)
+
+
+class ScalableBloomDedupStore:
+    """
+    Scalable bloom filter (Almeida et al.). A new, larger filter with a tighter
+    error rate is added whenever the current one reaches its capacity, which keeps
+    the compound false positive rate below `error_rate` regardless of how many keys
+    are added. A false positive means a new row is reported as duplicated.
+    """
+
+    def __init__(
+        self,
+        error_rate: float = 0.001,
+        initial_capacity: int = 8192,
+        growth_factor: int = 2,
+        tightening_ratio: float = 0.5,
+    ) -> None:
+        self.error_rate = error_rate
+        self._initial_capacity = initial_capacity
+        self._growth_factor = growth_factor
+        self._tightening_ratio = tightening_ratio
+        self._filters: list[BloomFilter] = []
+        self._add_filter()
+
+    def _add_filter(self) -> None:
+        n = len(self._filters)
+        self._filters.append(
+            BloomFilter(
+                capacity=self._initial_capacity * self._growth_factor**n,
+                error_rate=self.error_rate
+                * (1 - self._tightening_ratio)
+                * self._tightening_ratio**n,
+            )
+        )
+
+    def add(self, key: bytes) -> bool:
+        h1, h2 = split_key(key)
+        for f in self._filters:
+            if f.contains_hashes(h1, h2):
+                return True
+
+        if self._filters[-1].is_full:
+            self._add_filter()
+        self._filters[-1].add_hashes(h1, h2)
+        return False
+
+    def __contains__(self, key: bytes) -> bool:
+        h1, h2 = split_key(key)
+        return any(f.contains_hashes(h1, h2) for f in self._filters)
+
+    def __len__(self) -> int:
+        return sum(len(f) for f in self._filters)
+
+    @property
+    def size_in_bytes(self) -> int:
+        return sum(f.size_in_bytes for f in self._filters)
+
+
+class SqliteDedupStore:
+    """
+    Persists digests to a SQLite database keyed by domain and stage so that deduplication
+    carries over between runs. Existing digests are loaded into an in-memory `cache` store
+    on start and new ones are appended in batches of `commit_every` keys.
+    Rows, urls and downloads seen in a previous run are reported as duplicated, which also
+    stops pagination once a page only contains previously seen rows.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        domain: str,
+        stage: str,
+        cache: Optional[DedupStore] = None,
+        commit_every: int = 1000,
+    ) -> None:
+        self.domain = domain
+        self.stage = stage
+        self._cache = cache if cache is not None else ExactDedupStore()
+        self._commit_every = commit_every
+        self._pending: list[bytes] = []
+
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            " domain TEXT NOT NULL, stage TEXT NOT NULL, hash BLOB NOT NULL,"
+            " PRIMARY KEY (domain, stage, hash)"
+            ") WITHOUT ROWID"
+        )
+        for (key,) in self._conn.execute(
+            "SELECT hash FROM hashes WHERE domain = ? AND stage = ?", (domain, stage)
+        ):
+            self._cache.add(key)
+
+    def add(self, key: bytes) -> bool:
+        if self._cache.add(key):
+            return True
+
+        self._pending.append(key)
+        if len(self._pending) >= self._commit_every:
+            self.flush()
+        return False
+
+    def flush(self) -> None:
+        # Writes are batched so no transaction is held open between flushes
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO hashes (domain, stage, hash) VALUES (?, ?, ?)",
+                [(self.domain, self.stage, key) for key in self._pending],
+            )
+        self._pending.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+@runtime_checkable
+class ContentIndex(Protocol):
+    def get(self, primary_key: str) -> Optional[bytes]:
+        """
+        :param primary_key: the `$primary_key` of a row
+        :return: the content hash last recorded for the row, None if it has never been seen
+        """
+        ...
+
+    def put(self, primary_key: str, digest: bytes) -> None: ...
+
+
+class SqliteContentIndex:
+    """
+    Maps row primary keys to their content hash, persisted to SQLite by domain and stage
+    so that rows can be compared against the previous run. Writes are batched like `SqliteDedupStore`.
+    """
+
+    def __init__(
+        self, path: str | Path, domain: str, stage: str, commit_every: int = 1000
+    ) -> None:
+        self.domain = domain
+        self.stage = stage
+        self._commit_every = commit_every
+        self._pending: dict[str, bytes] = {}
+
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS content ("
+            " domain TEXT NOT NULL, stage TEXT NOT NULL, pk TEXT NOT NULL, hash BLOB NOT NULL,"
+            " PRIMARY KEY (domain, stage, pk)"
+            ") WITHOUT ROWID"
+        )
+
+    def get(self, primary_key: str) -> Optional[bytes]:
+        if primary_key in self._pending:
+            return self._pending[primary_key]
+
+        row = self._conn.execute(
+            "SELECT hash FROM content WHERE domain = ? AND stage = ? AND pk = ?",
+            (self.domain, self.stage, primary_key),
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(self, primary_key: str, digest: bytes) -> None:
+        self._pending[primary_key] = digest
+        if len(self._pending) >= self._commit_every:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO content (domain, stage, pk, hash) VALUES (?, ?, ?, ?)",
+                [(self.domain, self.stage, pk, h) for pk, h in self._pending.items()],
+            )
+        self._pending.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
+
+
+def get_dedup_store(backend: DedupBackend | DedupStore) -> DedupStore:
+    if isinstance(backend, DedupStore):
+        return backend
+    if backend == "exact":
+        return ExactDedupStore()
+    elif backend == "bloom":
+        return ScalableBloomDedupStore()
+
+    raise ValueError(f"Unknown dedup backend: {backend}")
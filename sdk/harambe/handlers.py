@@ -1,10 +1,27 @@
 import base64
+import fnmatch
+import os
 import re
 import time
 from abc import ABC
-from typing import Any, Literal, Self
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Iterable, Literal, Mapping, Optional, Self
+from urllib.parse import urlsplit
 
-from playwright.async_api import Page, Route
+from playwright.async_api import BrowserContext, Page, Request, Response, Route
+from playwright.async_api import Error as PlaywrightError
+
+from harambe.http_cache import (
+    ResponseCache,
+    cache_key,
+    conditional_headers,
+    freshness_lifetime,
+    is_storable,
+    storable_headers,
+)
+from harambe.rate_limit import HostRateLimiter
+from harambe.replay import ResponseArchive
 
 ResourceType = Literal[
     "document",
@@ -23,6 +40,27 @@ ResourceType = Literal[
     "*",
 ]
 
+BlockingMode = Literal["route", "native"]
+BlockedResourceClass = Literal["image", "media", "font", "tracking"]
+
+
+def _extensions(*extensions: str) -> tuple[str, ...]:
+    return tuple(
+        pattern
+        for ext in extensions
+        for pattern in (f"*.{ext}", f"*.{ext}?*", f"*.{ext.upper()}")
+    )
+
+
+BLOCKED_URL_PATTERNS: dict[BlockedResourceClass, tuple[str, ...]] = {
+    "image": _extensions(
+        "png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp"
+    ),
+    "media": _extensions("mp4", "webm", "mov", "m4v", "mp3", "m4a", "wav", "ogg"),
+    "font": _extensions("woff", "woff2", "ttf", "otf", "eot"),
+    "tracking": ("*/social-widget*", "*/tracking-script*", "*/ads/*"),
+}
+
 FAKE_IMAGE_BYTES = base64.b64decode(
     "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
 )
@@ -100,19 +138,363 @@ class ResourceRequestHandler(AbstractHandler):
         return self._new_pages[0] if self._new_pages else None
 
 
-class UnnecessaryResourceHandler:
+ResourceAction = Literal["allow", "abort", "placeholder"]
+
+DEFAULT_RESOURCE_RULES: dict[ResourceType, ResourceAction] = {
+    "image": "placeholder",
+    "media": "placeholder",
+    "font": "abort",
+}
+
+
+class DomainTrie:
+    """
+    Set of domains matched by suffix, blocking `ads.example` also blocks `cdn.ads.example`. Domains are
+    stored label by label from the TLD down, so a lookup is linear in the length of the host
+    regardless of the size of the blocklist.
+    """
+
+    _END = "."  # Can't clash with a label
+
+    def __init__(self, domains: Iterable[str] = ()) -> None:
+        self._root: dict[str, Any] = {}
+        self._size = 0
+        for domain in domains:
+            self.add(domain)
+
+    def add(self, domain: str) -> None:
+        node = self._root
+        for label in reversed(domain.strip().strip(".").lower().split(".")):
+            node = node.setdefault(label, {})
+        if self._END not in node:
+            node[self._END] = True
+            self._size += 1
+
+    def __contains__(self, host: str) -> bool:
+        node = self._root
+        for label in reversed(host.rstrip(".").lower().split(".")):
+            node = node.get(label)  # type: ignore
+            if node is None:
+                return False
+            if self._END in node:
+                return True
+        return False
+
+    def __len__(self) -> int:
+        return self._size
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> Self:
+        """
+        Load a blocklist with one domain per line. Hosts files (`0.0.0.0 ads.example`) and adblock domain
+        rules (`||ads.example^`) are accepted as well, `#` starts a comment.
+        """
+        trie = cls()
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                tokens = line.split("#", 1)[0].split()
+                if not tokens:
+                    continue
+                domain = tokens[1] if len(tokens) > 1 else tokens[0]
+                domain = domain.removeprefix("||").removesuffix("^")
+                if domain and domain not in ("localhost", "0.0.0.0"):
+                    trie.add(domain)
+        return trie
+
+
+@lru_cache(maxsize=16)
+def _load_blocklist(path: str, _mtime: float) -> DomainTrie:
+    return DomainTrie.from_file(path)
+
+
+def load_blocklist(path: str | Path) -> DomainTrie:
+    """Load a blocklist file, cached until the file is modified so that runs share the parsed trie"""
+    return _load_blocklist(str(path), os.path.getmtime(path))
+
+
+class ResourceBlockingPolicy:
+    """
+    Decides what happens to every request of a context when routed through `handle`:
+
+    - requests to `blocked_domains` (or any of their subdomains) are aborted, except top level navigations
+    - requests are then handled according to the `rules` for their resource type, "placeholder" fulfills
+      them with a 1x1 png
+    - `data:` urls for images, audio and video and urls matching `blocked_url_pattern` are aborted
+
+    :example:
+        >>> policy = ResourceBlockingPolicy(
+        >>>     rules={**DEFAULT_RESOURCE_RULES, "stylesheet": "abort"},
+        >>>     blocklist_files=["blocklists/ads.txt"],
+        >>> )
+        >>> await SDK.run(scraper, url, resource_blocking=policy)
+    """
+
+    def __init__(
+        self,
+        rules: Mapping[ResourceType, ResourceAction] = DEFAULT_RESOURCE_RULES,
+        blocked_domains: Iterable[str] = (),
+        blocklist_files: Iterable[str | Path] = (),
+        blocked_url_pattern: str | None = None,
+    ) -> None:
+        self.rules = dict(rules)
+        self.blocked_url_pattern = (
+            re.compile(blocked_url_pattern) if blocked_url_pattern else None
+        )
+        self.blocked_domains = [load_blocklist(path) for path in blocklist_files]
+        if blocked_domains:
+            self.blocked_domains.append(DomainTrie(blocked_domains))
+
+    def is_blocked_host(self, host: str) -> bool:
+        return any(host in trie for trie in self.blocked_domains)
+
+    def action(
+        self, url: str, resource_type: str, is_navigation: bool = False
+    ) -> ResourceAction:
+        if self.blocked_domains and not is_navigation:
+            host = urlsplit(url).hostname
+            if host and self.is_blocked_host(host):
+                return "abort"
+
+        if (rule := self.rules.get(resource_type, "allow")) != "allow":  # type: ignore
+            return rule
+
+        if _MEDIA_DATA_URL.match(url) or (
+            self.blocked_url_pattern and self.blocked_url_pattern.match(url)
+        ):
+            return "abort"
+        return "allow"
+
     async def handle(self, route: Route) -> None:
-        resource_type = route.request.resource_type
-        url = route.request.url
-        if resource_type in ["image", "media"]:
+        request = route.request
+        action = self.action(
+            request.url, request.resource_type, _is_top_level_navigation(request)
+        )
+
+        if action == "placeholder":
             await route.fulfill(body=FAKE_IMAGE_BYTES, content_type="image/png")
+        elif action == "abort":
+            await route.abort("blockedbyclient")
+        else:
+            await route.fallback()
+
+
+_MEDIA_DATA_URL = re.compile(r"^data:(image|audio|video)")
+
+
+def _is_top_level_navigation(request: Request) -> bool:
+    try:
+        return request.is_navigation_request() and request.frame.parent_frame is None
+    except Exception:
+        # Service worker requests have no frame
+        return False
+
+
+class UnnecessaryResourceHandler(ResourceBlockingPolicy):
+    """Default policy, replaces images and media with a placeholder and aborts fonts and tracking scripts"""
+
+    def __init__(self) -> None:
+        super().__init__(blocked_url_pattern=r"social-widget|tracking-script|ads")
+
+
+class CachingResourceHandler:
+    """
+    Serves static assets from an on-disk `ResponseCache` so that bundles shared across pages are only
+    downloaded once while fresh. GET responses for `resource_types` (plus documents with `cache_documents`)
+    are stored by url and the values of `vary_headers`, following `Cache-Control`, `ETag` and `Last-Modified`
+    like the soup harness: stale entries are revalidated with a conditional request and reused on a 304.
+    Requests that fail to reach the network are aborted.
+    """
+
+    def __init__(
+        self,
+        cache: ResponseCache,
+        resource_types: Iterable[str] = ("script", "stylesheet"),
+        cache_documents: bool = False,
+        vary_headers: Iterable[str] = ("accept-language",),
+    ) -> None:
+        self.cache = cache
+        self.resource_types = set(resource_types)
+        if cache_documents:
+            self.resource_types.add("document")
+        self.vary_headers = [h.lower() for h in vary_headers]
+
+    def key(self, request: Request) -> str | None:
+        """Cache key of the request, None if it isn't cached"""
+        if request.method != "GET" or request.resource_type not in self.resource_types:
+            return None
+        return cache_key(
+            request.method,
+            request.url,
+            {h: request.headers.get(h) for h in self.vary_headers},
+        )
+
+    async def handle(self, route: Route) -> None:
+        if (key := self.key(route.request)) is None:
+            await route.fallback()
+            return
+
+        try:
+            status, headers, body = await self.fetch(route, key)
+        except PlaywrightError:
+            await route.abort("failed")
             return
-        elif (
-            resource_type == "font"
-            or re.match(r"^data:(image|audio|video)", url)
-            or re.match(r"social-widget|tracking-script|ads", url)
+        await route.fulfill(status=status, headers=headers, body=body)
+
+    async def fetch(self, route: Route, key: str) -> tuple[int, dict[str, str], bytes]:
+        """Status, headers and body of the request from the cache, or from the network when it isn't fresh"""
+        cached = self.cache.get(key)
+        if cached and cached.fresh:
+            return cached.status, cached.headers, cached.body
+
+        if cached:
+            response = await route.fetch(
+                headers={**route.request.headers, **conditional_headers(cached)}
+            )
+        else:
+            response = await route.fetch()
+        body = await response.body()
+
+        if cached and response.status == 304:
+            # The 304 carries the updated freshness for the stored response
+            merged = {**cached.headers, **storable_headers(response.headers)}
+            expires_at = time.time() + freshness_lifetime(merged)
+            cached = (
+                self.cache.put(key, cached.status, merged, cached.body, expires_at)
+                or cached
+            )
+            return cached.status, cached.headers, cached.body
+
+        # Redirected responses aren't stored since the cache doesn't keep the final url
+        if response.url == route.request.url and is_storable(
+            response.status, response.headers
         ):
-            await route.abort("blockedbyclient")
+            expires_at = time.time() + freshness_lifetime(response.headers)
+            self.cache.put(key, response.status, response.headers, body, expires_at)
+        elif cached:
+            self.cache.delete(key)
+        # The body has already been decoded
+        return response.status, storable_headers(response.headers), body
+
+
+class ReplayHandler:
+    """
+    Records every response into a `ResponseArchive`, or fulfills requests from it when the archive is opened
+    for replay. Requests that weren't recorded are aborted as if the network was down.
+    While recording, requests the `cache` handles go through it so that cached assets are recorded too.
+    """
+
+    def __init__(
+        self, archive: ResponseArchive, cache: Optional[CachingResourceHandler] = None
+    ) -> None:
+        self.archive = archive
+        self.cache = cache
+
+    async def handle(self, route: Route) -> None:
+        request = route.request
+        post_data = request.post_data_buffer
+
+        if self.archive.mode == "replay":
+            recorded = self.archive.replay(request.method, request.url, post_data)
+            if recorded is None:
+                await route.abort("internetdisconnected")
+                return
+
+            await route.fulfill(
+                status=recorded.status, headers=recorded.headers, body=recorded.body
+            )
+            return
+
+        try:
+            if self.cache and (key := self.cache.key(request)) is not None:
+                status, headers, body = await self.cache.fetch(route, key)
+            else:
+                response = await route.fetch()
+                # The body has already been decoded
+                status, headers, body = (
+                    response.status,
+                    storable_headers(response.headers),
+                    await response.body(),
+                )
+        except PlaywrightError:
+            await route.abort("failed")
             return
 
+        self.archive.record(
+            request.method, request.url, status, headers, body, post_data
+        )
+        await route.fulfill(status=status, headers=headers, body=body)
+
+
+class RateLimitHandler:
+    """
+    Holds navigations until their host has a token in the `HostRateLimiter` and reports the status and
+    latency of the documents received back to it. Subresources aren't limited.
+    """
+
+    def __init__(self, limiter: HostRateLimiter) -> None:
+        self.limiter = limiter
+
+    async def handle(self, route: Route) -> None:
+        request = route.request
+        if request.is_navigation_request():
+            await self.limiter.acquire(request.url)
         await route.fallback()
+
+    def on_response(self, response: Response) -> None:
+        request = response.request
+        if not request.is_navigation_request():
+            return
+
+        # Milliseconds from the start of the request, -1 when the browser didn't report it
+        received = request.timing.get("responseStart", -1)
+        latency = received / 1000 if received >= 0 else None
+        self.limiter.feedback(request.url, response.status, latency)
+
+
+class NativeResourceBlocker:
+    """
+    Blocks requests whose url matches the glob lists in `BLOCKED_URL_PATTERNS` without calling into Python
+    for every request like `UnnecessaryResourceHandler` does. On Chromium the patterns are handed to the
+    browser with CDP `Network.setBlockedURLs`, which has to be done per page. Other browsers fall back to
+    a single context route on the precompiled patterns, which playwright matches before dispatching, so
+    only blocked requests reach Python.
+
+    Resources are matched on their url rather than their type, so images or fonts served without a
+    file extension are not blocked.
+    """
+
+    def __init__(
+        self,
+        resource_classes: Iterable[BlockedResourceClass] = (
+            "image",
+            "media",
+            "font",
+            "tracking",
+        ),
+    ) -> None:
+        self.url_patterns = [
+            pattern
+            for resource_class in resource_classes
+            for pattern in BLOCKED_URL_PATTERNS[resource_class]
+        ]
+        self.url_regex = re.compile(
+            "|".join(fnmatch.translate(pattern) for pattern in self.url_patterns)
+        )
+
+    @staticmethod
+    def _is_chromium(ctx: BrowserContext) -> bool:
+        return ctx.browser is not None and ctx.browser.browser_type.name == "chromium"
+
+    async def attach_to_context(self, ctx: BrowserContext) -> None:
+        if not self._is_chromium(ctx):
+            await ctx.route(self.url_regex, self._abort)
+
+    async def attach_to_page(self, page: Page) -> None:
+        if self._is_chromium(page.context):
+            session = await page.context.new_cdp_session(page)
+            await session.send("Network.enable")
+            await session.send("Network.setBlockedURLs", {"urls": self.url_patterns})
+
+    @staticmethod
+    async def _abort(route: Route) -> None:
+        await route.abort("blockedbyclient")
@@ -0,0 +1,227 @@
+import hashlib
+import json
+import sqlite3
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Mapping, NamedTuple, Optional
+
+# Hop by hop or encoding headers that no longer apply once the body has been decoded
+_UNCACHED_HEADERS = frozenset(
+    {"content-encoding", "content-length", "transfer-encoding", "connection"}
+)
+
+
+class CachedResponse(NamedTuple):
+    status: int
+    headers: dict[str, str]
+    body: bytes
+    stored_at: float
+    expires_at: float
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+
+def cache_key(
+    method: str, url: str, vary: Mapping[str, Optional[str]] | None = None
+) -> str:
+    """
+    Key of a response, the method and url along with the request headers the response varies on
+    """
+    parts = [
+        method.upper(),
+        url,
+        *(f"{k.lower()}:{v}" for k, v in sorted((vary or {}).items())),
+    ]
+    return hashlib.blake2b("\n".join(parts).encode(), digest_size=16).hexdigest()
+
+
+def storable_headers(headers: Mapping[str, str]) -> dict[str, str]:
+    return {
+        k.lower(): v for k, v in headers.items() if k.lower() not in _UNCACHED_HEADERS
+    }
+
+
+def _lower(headers: Mapping[str, str]) -> dict[str, str]:
+    return {k.lower(): v for k, v in headers.items()}
+
+
+def parse_cache_control(value: str) -> dict[str, Optional[str]]:
+    directives: dict[str, Optional[str]] = {}
+    for part in value.split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else None
+    return directives
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp() if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness_lifetime(headers: Mapping[str, str]) -> float:
+    """
+    Seconds a response can be reused without revalidating it, from `Cache-Control` or `Expires`.
+    Responses without explicit freshness have to be revalidated every time.
+    """
+    headers = _lower(headers)
+    cache_control = parse_cache_control(headers.get("cache-control", ""))
+    if "no-cache" in cache_control:
+        return 0
+
+    age = float(headers.get("age", 0) or 0)
+    for directive in ("s-maxage", "max-age"):
+        try:
+            return max(float(cache_control[directive] or 0) - age, 0)
+        except (KeyError, ValueError):
+            continue
+
+    expires, date = _http_date(headers.get("expires")), _http_date(headers.get("date"))
+    if expires is not None:
+        return max(expires - (date or time.time()), 0)
+    return 0
+
+
+def is_storable(status: int, headers: Mapping[str, str]) -> bool:
+    """Only full responses are stored, and only if they are either fresh for a while or can be revalidated"""
+    headers = _lower(headers)
+    if status != 200 or "no-store" in parse_cache_control(
+        headers.get("cache-control", "")
+    ):
+        return False
+    return (
+        "etag" in headers
+        or "last-modified" in headers
+        or freshness_lifetime(headers) > 0
+    )
+
+
+def conditional_headers(cached: "CachedResponse") -> dict[str, str]:
+    """Validators to revalidate a stale response with, a 304 means the cached body can be reused"""
+    headers = {}
+    if etag := cached.headers.get("etag"):
+        headers["If-None-Match"] = etag
+    if last_modified := cached.headers.get("last-modified"):
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+class ResponseCache:
+    """
+    On-disk HTTP response cache backed by SQLite. Entries are kept until the total size of the stored
+    bodies exceeds `max_bytes`, at which point the least recently used ones are evicted. Expired entries
+    are still returned by `get` so that they can be revalidated, check `CachedResponse.fresh`.
+
+    :param path: the SQLite database to store responses in, shared between runs
+    :param max_bytes: maximum total size of the stored bodies
+    :param ttl: seconds a response stays fresh when `put` isn't given an expiry
+    """
+
+    def __init__(
+        self, path: str | Path, max_bytes: int = 512 * 1024 * 1024, ttl: float = 3600
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._conn = sqlite3.connect(path)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, status INTEGER NOT NULL, headers TEXT NOT NULL,"
+                " body BLOB NOT NULL, size INTEGER NOT NULL, stored_at REAL NOT NULL,"
+                " expires_at REAL NOT NULL, accessed_at REAL NOT NULL"
+                ")"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_lru ON responses (accessed_at)"
+            )
+        (self._size,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        row = self._conn.execute(
+            "SELECT status, headers, body, stored_at, expires_at FROM responses WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+
+        with self._conn:
+            self._conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+        status, headers, body, stored_at, expires_at = row
+        return CachedResponse(status, json.loads(headers), body, stored_at, expires_at)
+
+    def put(
+        self,
+        key: str,
+        status: int,
+        headers: Mapping[str, str],
+        body: bytes,
+        expires_at: Optional[float] = None,
+    ) -> Optional[CachedResponse]:
+        """Store a response, returns None if the body is too large to ever fit in the cache"""
+        if len(body) > self.max_bytes:
+            return None
+
+        now = time.time()
+        response = CachedResponse(
+            status,
+            storable_headers(headers),
+            body,
+            now,
+            expires_at if expires_at is not None else now + self.ttl,
+        )
+        with self._conn:
+            self._remove(key)
+            self._conn.execute(
+                "INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    response.status,
+                    json.dumps(response.headers),
+                    body,
+                    len(body),
+                    response.stored_at,
+                    response.expires_at,
+                    now,
+                ),
+            )
+            self._size += len(body)
+            self._evict()
+        return response
+
+    def delete(self, key: str) -> None:
+        with self._conn:
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        row = self._conn.execute(
+            "DELETE FROM responses WHERE key = ? RETURNING size", (key,)
+        ).fetchone()
+        if row:
+            self._size -= row[0]
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes:
+            key, size = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at LIMIT 1"
+            ).fetchone()
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._size -= size
+
+    @property
+    def size_in_bytes(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
@@ -1,32 +1,105 @@
+import copy
 import hashlib
 import json
+from collections import deque
+from functools import lru_cache
 from typing import Any, Optional, Iterable, List
 
-from pydantic import BaseModel
+from harambe_core.normalize_url import merge_query_params, normalize_url
 
+from harambe.dedup import (
+    ChangeStatus,
+    ContentIndex,
+    DedupBackend,
+    DedupStore,
+    get_dedup_store,
+)
 from harambe.types import URL, Context, Options, Cookie, LocalStorage
 
 
-class PageInfo(BaseModel):
-    page: int
-    total_rows: int
-    duplicated_rows: int
+class PageInfo:
+    """Row counters for a single page. Plain slots as these are updated for every saved row"""
+
+    __slots__ = ("page", "total_rows", "duplicated_rows")
+
+    def __init__(self, page: int, total_rows: int = 0, duplicated_rows: int = 0):
+        self.page = page
+        self.total_rows = total_rows
+        self.duplicated_rows = duplicated_rows
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PageInfo):
+            return NotImplemented
+        return (self.page, self.total_rows, self.duplicated_rows) == (
+            other.page,
+            other.total_rows,
+            other.duplicated_rows,
+        )
+
+    def __repr__(self) -> str:
+        return f"PageInfo(page={self.page}, total_rows={self.total_rows}, duplicated_rows={self.duplicated_rows})"
 
 
 class DuplicateHandler:
-    def __init__(self) -> None:
-        self._saved_data: set[bytes] = set()
-        self.current_page: int = 1
-        self.page_info_map: dict[int, PageInfo] = {}
+    def __init__(
+        self,
+        backend: DedupBackend | DedupStore = "exact",
+        content_index: Optional[ContentIndex] = None,
+        history_size: int = 100,
+    ) -> None:
+        """
+        :param backend: "exact" to keep every hash in memory, "bloom" for a scalable bloom filter
+        that uses a fraction of the memory at the cost of a small false positive rate,
+        or a custom `DedupStore` instance (eg: `SqliteDedupStore` to deduplicate across runs)
+        :param content_index: optional primary key to content hash index (eg: `SqliteContentIndex`).
+        When set, rows whose content is unchanged since the index last saw their `$primary_key`
+        are suppressed and the remaining rows are tagged with `__change` ("new" or "changed"). Rows with a
+        `$primary_key` are then left out of the dedup store
+        :param history_size: number of completed pages to keep stats for, see `get_page_history`
+        """
+        self._saved_data: DedupStore = get_dedup_store(backend)
+        self._content_index = content_index
+        self._page_info = PageInfo(page=1)
+        self._page_history: deque[PageInfo] = deque(maxlen=history_size)
 
     def on_save_data(self, data: dict[str, Any]) -> bool:
         """
         Save data and check if it is duplicated
         :param data: data to be saved
-        :return: bool indicating if the data is duplicated, true if it is duplicated
+        :return: bool indicating if the data is duplicated (or unchanged), true if it is duplicated
+        """
+        hash_value = self.compute_hash(data)
+        if self._content_index is None or "$primary_key" not in data:
+            return self._add_hash(hash_value)
+
+        # Keyed rows are only checked against the content index. Going through the dedup store as well
+        # would suppress a row whose content changes back to a version seen in an earlier run.
+        # Unchanged rows are dropped without counting as duplicated, a recrawl has to keep paginating
+        # to reach the rows that did change
+        self._page_info.total_rows += 1
+        change = self.detect_change(str(data["$primary_key"]), hash_value)
+        if change == "unchanged":
+            return True
+
+        data["__change"] = change
+        return False
+
+    def detect_change(self, primary_key: str, hash_value: bytes) -> ChangeStatus:
         """
+        Compare a row's content hash with the one recorded for its primary key and record the new hash
+        :param primary_key: the `$primary_key` of the row
+        :param hash_value: the content hash of the row from `compute_hash`
+        :return: "new", "changed" or "unchanged"
+        """
+        if self._content_index is None:
+            raise RuntimeError("DuplicateHandler was created without a content index")
+
+        previous = self._content_index.get(primary_key)
+        if previous == hash_value:
+            return "unchanged"
 
-        return self._add_data(data)
+        self._content_index.put(primary_key, hash_value)
+        return "new" if previous is None else "changed"
 
     def on_save_cookies(self, cookies: List[Cookie]) -> bool:
         """
@@ -70,54 +143,113 @@ class DuplicateHandler:
         :return: bool indicating if pagination should continued
         """
 
+        info = self._page_info
         if strict:
-            return self.get_current_page_info().duplicated_rows == 0
+            return info.duplicated_rows == 0
 
-        return (
-            self.get_current_page_info().total_rows > 0
-            and self.get_current_page_info().total_rows
-            == self.get_current_page_info().duplicated_rows
-        )
+        return info.total_rows > 0 and info.total_rows == info.duplicated_rows
 
     def on_paginate(self, next_url: str) -> bool:
         if self.should_continue():
             raise StopAsyncIteration()
 
-        self.current_page += 1
+        self._page_history.append(self._page_info)
+        self._page_info = PageInfo(page=self._page_info.page + 1)
         return False
 
     def _add_data(self, data: Any) -> bool:
         """
         :return: bool indicating whether the data is duplicated or not
         """
-        self.get_current_page_info().total_rows += 1
+        return self._add_hash(self.compute_hash(data))
 
-        hash_value = self.compute_hash(data)
-        if hash_value in self._saved_data:
-            self.get_current_page_info().duplicated_rows += 1
+    def _add_hash(self, hash_value: bytes) -> bool:
+        info = self._page_info
+        info.total_rows += 1
+
+        if self._saved_data.add(hash_value):
+            info.duplicated_rows += 1
             return True
-        else:
-            self._saved_data.add(hash_value)
-            return False
+
+        return False
+
+    def flush(self) -> None:
+        """Persist pending hashes if the dedup store or content index supports it"""
+        for store in (self._saved_data, self._content_index):
+            if flush := getattr(store, "flush", None):
+                flush()
+
+    def fork(self, page: int) -> "DuplicateHandler":
+        """
+        Create a handler for a page that is scraped concurrently with other pages. It shares the
+        dedup store, content index and page history with this handler but counts its rows separately.
+        Pass the forks to `join` once their pages are done.
+        """
+        child = copy.copy(self)
+        child._page_info = PageInfo(page=page)
+        return child
+
+    def join(self, forks: Iterable["DuplicateHandler"]) -> None:
+        """Record the pages of forked handlers, the last page becomes the current page"""
+        infos = sorted((f._page_info for f in forks), key=lambda info: info.page)
+        if not infos:
+            return
+
+        self._page_history.append(self._page_info)
+        self._page_history.extend(infos[:-1])
+        self._page_info = infos[-1]
+
+    @property
+    def current_page(self) -> int:
+        return self._page_info.page
 
     def get_number_of_pages(self) -> int:
         return self.current_page
 
     def get_current_page_info(self) -> PageInfo:
-        if self.current_page not in self.page_info_map:
-            self.page_info_map[self.current_page] = PageInfo(
-                page=self.current_page, total_rows=0, duplicated_rows=0
-            )
+        return self._page_info
 
-        return self.page_info_map[self.current_page]
+    def get_page_history(self) -> list[PageInfo]:
+        """
+        :return: stats for the most recent completed pages (up to `history_size`) followed by the current page
+        """
+        return [*self._page_history, self._page_info]
 
     @staticmethod
     def compute_hash(data: Any) -> bytes:
+        """
+        Compute a canonical 16 byte hash of the data. Top level keys starting with `__` are ignored.
+        Plain strings (eg: urls) skip serialization entirely, they are tagged apart from serialized values so
+        that a string can't collide with the JSON of another value (eg: '["a",1]' and ("a", 1)).
+        """
+        if isinstance(data, str):
+            return hashlib.blake2b(b"s:" + data.encode(), digest_size=16).digest()
+
         if isinstance(data, dict):
             data = {k: v for k, v in data.items() if not k.startswith("__")}
 
-        data_str = json.dumps(data, separators=(",", ":"), sort_keys=True)
-        return hashlib.md5(data_str.encode()).digest()
+        return hashlib.blake2b(
+            b"j:" + _canonical_json(data).encode(), digest_size=16
+        ).digest()
+
+
+# Reused across calls, `json.dumps` builds a new encoder whenever non-default options are passed
+_canonical_json = json.JSONEncoder(
+    separators=(",", ":"), sort_keys=True, check_circular=False
+).encode
+
+
+@lru_cache(maxsize=128)
+def resolve_next_page_url(current_url: str, next_url: str) -> URL:
+    """
+    Resolve the url returned by a pagination function against the current page url. Query strings
+    (eg: "?page=2") are merged into the current query. Cached as the same page is resolved several
+    times when prefetching and the url of every page is parsed along the way.
+    """
+    if next_url.startswith("?"):
+        next_url = merge_query_params(current_url, next_url)
+
+    return normalize_url(next_url, current_url)
 
 
 class PaginatedList(list[Any]):
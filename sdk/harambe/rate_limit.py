@@ -0,0 +1,147 @@
+import asyncio
+import time
+from typing import NamedTuple, Optional
+from urllib.parse import urlsplit
+
+# Responses telling the client to slow down
+THROTTLED_STATUSES = frozenset({429, 503})
+
+
+class TokenBucket:
+    """
+    Allows `rate` acquisitions per second on average and up to `burst` back to back.
+    Waiters are served in the order they called `acquire`.
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._tokens + (now - self._updated) * self.rate, self.burst)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def drain(self) -> None:
+        """Drop the tokens saved up so that the next acquisition waits for a refill"""
+        self._refill()
+        self._tokens = min(self._tokens, 0)
+
+
+class HostRate(NamedTuple):
+    rate: float
+    requests: int
+    throttled: int
+    latency: float
+
+
+class _HostState:
+    def __init__(self, bucket: TokenBucket) -> None:
+        self.bucket = bucket
+        self.requests = 0
+        self.throttled = 0
+        self.latency = 0.0
+        self.baseline = float("inf")
+
+
+class HostRateLimiter:
+    """
+    Token bucket per host shared by all the pages of a run, requests wait in `acquire` until their host
+    has a token and report back with `feedback` once answered.
+
+    In adaptive mode the rate of a host is adjusted AIMD-style: it is multiplied by `decrease` when the host
+    answers 429 or 503, and raised by `increase` after every other response as long as the latency stays
+    within `latency_tolerance` times the fastest one seen for the host.
+
+    :param rate: requests per second allowed to each host, the starting rate in adaptive mode
+    :param burst: requests allowed back to back before the rate applies
+    :param adaptive: adjust each host's rate to its responses
+    :param min_rate: lowest rate adaptive mode backs off to
+    :param max_rate: highest rate adaptive mode ramps up to
+    :param increase: requests per second added after a response with flat latency
+    :param decrease: factor applied to the rate after a throttled response
+    :param latency_tolerance: how much slower than its fastest response a host can get before ramping up stops
+    """
+
+    def __init__(
+        self,
+        rate: float = 2.0,
+        burst: int = 1,
+        *,
+        adaptive: bool = False,
+        min_rate: float = 0.1,
+        max_rate: float = 20.0,
+        increase: float = 0.1,
+        decrease: float = 0.5,
+        latency_tolerance: float = 1.5,
+    ) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst
+        self.adaptive = adaptive
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self._hosts: dict[str, _HostState] = {}
+
+    def _host(self, url: str) -> _HostState:
+        host = urlsplit(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = _HostState(TokenBucket(self.rate, self.burst))
+        return self._hosts[host]
+
+    async def acquire(self, url: str) -> None:
+        state = self._host(url)
+        await state.bucket.acquire()
+        state.requests += 1
+
+    def feedback(self, url: str, status: int, latency: Optional[float] = None) -> None:
+        """
+        :param status: the status of the response
+        :param latency: seconds between sending the request and receiving the response, when known
+        """
+        state = self._host(url)
+        if latency is not None:
+            # Moving average so that a single slow response doesn't stop the ramp up
+            state.latency = (
+                0.8 * state.latency + 0.2 * latency if state.latency else latency
+            )
+            if status not in THROTTLED_STATUSES:
+                state.baseline = min(state.baseline, latency)
+        if status in THROTTLED_STATUSES:
+            state.throttled += 1
+
+        if not self.adaptive:
+            return
+
+        bucket = state.bucket
+        if status in THROTTLED_STATUSES:
+            bucket.rate = max(bucket.rate * self.decrease, self.min_rate)
+            bucket.drain()
+        elif state.latency <= state.baseline * self.latency_tolerance:
+            bucket.rate = min(bucket.rate + self.increase, self.max_rate)
+
+    @property
+    def metrics(self) -> dict[str, HostRate]:
+        """Current rate, request counts and smoothed latency of every host requested so far"""
+        return {
+            host: HostRate(
+                state.bucket.rate, state.requests, state.throttled, state.latency
+            )
+            for host, state in self._hosts.items()
+        }
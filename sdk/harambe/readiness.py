@@ -0,0 +1,84 @@
+import asyncio
+from typing import Any, Literal, Optional
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from harambe.contrib.soup.impl import SoupPage
+
+ReadinessStrategy = Literal[
+    "timeout", "network_idle", "dom_quiet", "selector", "url_change"
+]
+
+DOM_QUIET_PERIOD_MS = 500
+
+# Resolves once no DOM mutation has been observed for `quietMs`
+_WAIT_FOR_DOM_QUIET = """
+(quietMs) => new Promise((resolve) => {
+    let timer;
+    const observer = new MutationObserver(() => {
+        clearTimeout(timer);
+        timer = setTimeout(done, quietMs);
+    });
+    function done() {
+        observer.disconnect();
+        resolve();
+    }
+    timer = setTimeout(done, quietMs);
+    observer.observe(document, { subtree: true, childList: true, attributes: true, characterData: true });
+})
+"""
+
+
+async def wait_until_ready(
+    page: Any,
+    strategy: ReadinessStrategy,
+    *,
+    timeout: int,
+    previous_url: Optional[str] = None,
+    selector: Optional[str] = None,
+) -> None:
+    """
+    Wait for the page to be ready after a navigation or click. Every strategy other than "timeout" returns
+    as soon as its condition is met and gives up after `timeout` ms. This is a no-op for `SoupPage`,
+    which is ready as soon as the response is received.
+
+    :param page: the page to wait on
+    :param strategy:
+        - "timeout": sleep for `timeout` ms
+        - "network_idle": wait until there are no network connections for 500 ms
+        - "dom_quiet": wait until the DOM has not changed for 500 ms
+        - "selector": wait until `selector` is attached to the page
+        - "url_change": wait until the url differs from `previous_url`
+    :param timeout: milliseconds to sleep for, or the maximum time to wait for the strategy's condition
+    :param previous_url: the url before navigating, required for "url_change"
+    :param selector: the selector to wait for, required for "selector"
+    """
+    if isinstance(page, SoupPage):
+        return
+
+    if strategy == "selector" and not selector:
+        raise ValueError('A selector is required for the "selector" strategy')
+    if strategy == "url_change" and previous_url is None:
+        raise ValueError('The previous url is required for the "url_change" strategy')
+
+    if strategy == "timeout":
+        await page.wait_for_timeout(timeout)
+        return
+
+    try:
+        if strategy == "network_idle":
+            await page.wait_for_load_state("networkidle", timeout=timeout)
+        elif strategy == "selector":
+            await page.wait_for_selector(selector, state="attached", timeout=timeout)
+        elif strategy == "url_change":
+            await page.wait_for_url(lambda url: url != previous_url, timeout=timeout)
+        elif strategy == "dom_quiet":
+            await asyncio.wait_for(
+                page.evaluate(_WAIT_FOR_DOM_QUIET, DOM_QUIET_PERIOD_MS),
+                timeout=timeout / 1000,
+            )
+        else:
+            raise ValueError(f"Unknown readiness strategy: {strategy}")
+    except (PlaywrightTimeoutError, asyncio.TimeoutError):
+        # The page is as ready as it is going to get, carry on and let the scraper deal with it
+        pass
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import zipfile
+from collections import defaultdict
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import Any, Literal, Mapping, NamedTuple, Optional, Self
+
+from harambe.http_cache import storable_headers
+
+ArchiveMode = Literal["record", "replay"]
+
+_INDEX = "responses.json"
+
+
+class RecordedResponse(NamedTuple):
+    url: str
+    status: int
+    headers: dict[str, str]
+    body: bytes
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+class ResponseArchive:
+    """
+    Zip archive of the responses received during a run, used to replay the run without network access.
+    Bodies are deflated and stored once per distinct content, the index of requests is written when the
+    archive is closed.
+
+    Responses are matched on method, url and request body. When the same request was made several times
+    the responses are replayed in the order they were recorded, the last one being repeated.
+
+    :param path: the archive to record to or replay from
+    :param mode: "record" overwrites the archive, "replay" reads it
+    """
+
+    def __init__(self, path: str | Path, mode: ArchiveMode) -> None:
+        self.path = Path(path)
+        self.mode = mode
+        self._zip = zipfile.ZipFile(
+            self.path,
+            "w" if mode == "record" else "r",
+            compression=zipfile.ZIP_DEFLATED,
+        )
+        self._entries: list[dict[str, Any]] = []
+        self._bodies: set[str] = set()
+        self._replayed: dict[tuple[str, str, Optional[str]], list[dict[str, Any]]] = (
+            defaultdict(list)
+        )
+        self._cursors: dict[tuple[str, str, Optional[str]], int] = defaultdict(int)
+
+        if mode == "replay":
+            for entry in json.loads(self._zip.read(_INDEX)):
+                self._replayed[self._key(**entry)].append(entry)
+
+    @staticmethod
+    def _key(
+        method: str, url: str, request_body: Optional[str] = None, **_: Any
+    ) -> tuple[str, str, Optional[str]]:
+        return method.upper(), url, request_body
+
+    def record(
+        self,
+        method: str,
+        url: str,
+        status: int,
+        headers: Mapping[str, str],
+        body: bytes,
+        request_body: Optional[bytes] = None,
+    ) -> None:
+        if self.mode != "record":
+            raise ValueError("The archive was opened for replay")
+
+        digest = _digest(body)
+        if digest not in self._bodies:
+            self._zip.writestr(f"bodies/{digest}", body)
+            self._bodies.add(digest)
+
+        self._entries.append(
+            {
+                "method": method.upper(),
+                "url": url,
+                "request_body": _digest(request_body) if request_body else None,
+                "status": status,
+                "headers": storable_headers(headers),
+                "body": digest,
+            }
+        )
+
+    def replay(
+        self, method: str, url: str, request_body: Optional[bytes] = None
+    ) -> Optional[RecordedResponse]:
+        key = self._key(method, url, _digest(request_body) if request_body else None)
+        entries = self._replayed.get(key)
+        if not entries:
+            return None
+
+        index = min(self._cursors[key], len(entries) - 1)
+        self._cursors[key] += 1
+        entry = entries[index]
+        return RecordedResponse(
+            entry["url"],
+            entry["status"],
+            entry["headers"],
+            self._zip.read(f"bodies/{entry['body']}"),
+        )
+
+    def __len__(self) -> int:
+        if self.mode == "record":
+            return len(self._entries)
+        return sum(len(entries) for entries in self._replayed.values())
+
+    def close(self) -> None:
+        if self.mode == "record" and self._zip.fp is not None:
+            self._zip.writestr(_INDEX, json.dumps(self._entries))
+        self._zip.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+
+def open_response_archive(
+    stack: AsyncExitStack,
+    record_to: str | Path | None = None,
+    replay_from: str | Path | None = None,
+) -> Optional[ResponseArchive]:
+    """Open the archive for the `record_to` / `replay_from` harness options, closed along with the stack"""
+    if record_to and replay_from:
+        raise ValueError("Only one of record_to and replay_from can be set")
+    if record_to:
+        return stack.enter_context(ResponseArchive(record_to, "record"))
+    if replay_from:
+        return stack.enter_context(ResponseArchive(replay_from, "replay"))
+    return None
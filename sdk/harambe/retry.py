@@ -0,0 +1,158 @@
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Iterable, Mapping, Optional
+from urllib.parse import urlsplit
+
+from harambe_core.errors import CircuitOpenError
+from playwright.async_api import Error as PlaywrightError
+
+from harambe.contrib.types import AbstractPage, ResponseWithStatus
+
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Seconds to wait from a `Retry-After` header, given either as a delay or as a date"""
+    value = next((v for k, v in headers.items() if k.lower() == "retry-after"), None)
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter: the n-th retry waits a random delay up to `base_delay * 2 ** (n - 1)`,
+    capped at `max_delay`. A `Retry-After` header on the response takes precedence, within `max_delay`.
+
+    :param max_attempts: attempts in total, including the first one
+    :param base_delay: seconds to wait before the first retry, before jitter
+    :param max_delay: longest wait between two attempts
+    :param jitter: randomize the delays so that concurrent jobs don't retry in lockstep
+    :param retry_statuses: response statuses worth retrying
+    :param retry_exceptions: exceptions worth retrying, timeouts and network errors by default
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        jitter: bool = True,
+        retry_statuses: Iterable[int] = RETRYABLE_STATUSES,
+        retry_exceptions: tuple[type[BaseException], ...] = (PlaywrightError, OSError),
+    ) -> None:
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_exceptions = retry_exceptions
+
+    def delay(self, attempt: int, headers: Mapping[str, str] | None = None) -> float:
+        """Seconds to wait after the failed `attempt`, counting from 1"""
+        if headers and (requested := retry_after(headers)) is not None:
+            return min(requested, self.max_delay)
+
+        backoff = min(self.base_delay * 2 ** (attempt - 1), self.max_delay)
+        return random.uniform(0, backoff) if self.jitter else backoff
+
+
+class _Circuit:
+    def __init__(self) -> None:
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+
+class CircuitBreaker:
+    """
+    Stops navigating to a host after `failure_threshold` consecutive failed attempts, navigations to it
+    raise `CircuitOpenError` right away until `reset_timeout` has passed. A single navigation is then let
+    through, closing the circuit when it succeeds or opening it again when it fails.
+    Share one breaker between the runs of a batch.
+
+    :param failure_threshold: consecutive failures that open the circuit of a host
+    :param reset_timeout: seconds before trying an open host again
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._circuits: dict[str, _Circuit] = {}
+
+    def _circuit(self, url: str) -> _Circuit:
+        return self._circuits.setdefault(urlsplit(url).netloc, _Circuit())
+
+    def is_open(self, url: str) -> bool:
+        circuit = self._circuit(url)
+        return (
+            circuit.opened_at is not None
+            and time.monotonic() - circuit.opened_at < self.reset_timeout
+        )
+
+    def check(self, url: str) -> None:
+        circuit = self._circuit(url)
+        if self.is_open(url):
+            raise CircuitOpenError(urlsplit(url).netloc)
+        if circuit.opened_at is not None:
+            # Half open, hold the other navigations back while this one tries the host
+            circuit.opened_at = time.monotonic()
+
+    def record_success(self, url: str) -> None:
+        circuit = self._circuit(url)
+        circuit.failures = 0
+        circuit.opened_at = None
+
+    def record_failure(self, url: str) -> None:
+        circuit = self._circuit(url)
+        circuit.failures += 1
+        if circuit.failures >= self.failure_threshold:
+            circuit.opened_at = time.monotonic()
+
+
+async def goto_with_retry(
+    page: AbstractPage[Any],
+    url: str,
+    retry: Optional[RetryPolicy] = None,
+    circuit_breaker: Optional[CircuitBreaker] = None,
+) -> ResponseWithStatus:
+    """
+    Navigate to `url`, retrying failed attempts following `retry`. Once the attempts are exhausted the last
+    response is returned, or the last exception raised.
+    """
+    retry = retry or RetryPolicy(max_attempts=1)
+    attempt = 0
+    while True:
+        attempt += 1
+        if circuit_breaker:
+            circuit_breaker.check(url)
+
+        try:
+            response = await page.goto(url)
+        except retry.retry_exceptions:
+            if circuit_breaker:
+                circuit_breaker.record_failure(url)
+            if attempt >= retry.max_attempts:
+                raise
+            await asyncio.sleep(retry.delay(attempt))
+            continue
+
+        if response.status not in retry.retry_statuses:
+            if circuit_breaker:
+                circuit_breaker.record_success(url)
+            return response
+
+        if circuit_breaker:
+            circuit_breaker.record_failure(url)
+        if attempt >= retry.max_attempts:
+            return response
+        await asyncio.sleep(retry.delay(attempt, response.headers))
@@ -1,4 +1,6 @@
+from pathlib import Path
 from typing import (
+    TYPE_CHECKING,
     Awaitable,
     Callable,
     Literal,
@@ -13,6 +15,13 @@ from playwright.async_api import Page
 # noinspection PyUnresolvedReferences
 from harambe_core.types import LocalStorage, Cookie, URL, Context, Options, ScrapeResult
 
+from harambe.handlers import ResourceBlockingPolicy
+from harambe.http_cache import ResponseCache
+from harambe.rate_limit import HostRateLimiter
+
+if TYPE_CHECKING:
+    from harambe.contrib.playwright.pool import BrowserPool
+
 Stage = Literal["category", "listing", "detail"]
 AsyncScraperType = Callable[["SDK", URL, Context], Awaitable[None]]  # type: ignore # noqa: F821
 SetupType = Callable[["SDK"], Awaitable[None]]  # type: ignore # noqa: F821
@@ -47,6 +56,14 @@ class HarnessOptions(TypedDict, total=False):
     headers: Optional[dict[str, str]]
     viewport: Optional[ViewportSize]
     abort_unnecessary_requests: bool
+    blocking_mode: Literal["route", "native"]
+    resource_blocking: Optional[ResourceBlockingPolicy]
+    response_cache: Optional[ResponseCache]
+    cache_documents: bool
+    record_to: Optional[str | Path]
+    replay_from: Optional[str | Path]
+    parser: Literal["html.parser", "lxml", "selectolax"]
+    rate_limiter: Optional[HostRateLimiter]
     disable_go_to_url: bool
     on_start: Optional[Callback]
     on_end: Optional[Callback]
@@ -55,3 +72,5 @@ class HarnessOptions(TypedDict, total=False):
     extensions: Sequence[str]
     attach_to_existing_context: bool
     attach_to_existing_page: bool
+    prefetch: bool
+    browser_pool: Optional["BrowserPool"]
@@ -0,0 +1,114 @@
+import os
+
+import pytest
+
+from harambe.dedup import (
+    BloomFilter,
+    ExactDedupStore,
+    ScalableBloomDedupStore,
+    SqliteContentIndex,
+    SqliteDedupStore,
+    get_dedup_store,
+)
+from harambe.pagination import DuplicateHandler
+
+
+@pytest.mark.parametrize("backend", ["exact", "bloom"])
+def test_duplicate_handler_backends(backend):
+    handler = DuplicateHandler(backend=backend)
+
+    assert not handler.on_save_data({"foo": "bar"})
+    assert not handler.on_queue_url("https://example.com", {}, {})
+    assert handler.on_save_data({"foo": "bar"})
+    assert handler.on_queue_url("https://example.com", {}, {})
+
+
+def test_get_dedup_store():
+    store = ExactDedupStore()
+
+    assert get_dedup_store(store) is store
+    assert isinstance(get_dedup_store("exact"), ExactDedupStore)
+    assert isinstance(get_dedup_store("bloom"), ScalableBloomDedupStore)
+    with pytest.raises(ValueError):
+        get_dedup_store("unknown")  # type: ignore
+
+
+def test_bloom_filter_sizing():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+
+    assert bloom.num_bits == 9586
+    assert bloom.num_hashes == 7
+
+
+def test_scalable_bloom_has_no_false_negatives_and_grows():
+    store = ScalableBloomDedupStore(error_rate=0.001, initial_capacity=100)
+    keys = [os.urandom(16) for _ in range(1000)]
+
+    new = [store.add(key) for key in keys]
+    false_positives = sum(new)
+
+    assert false_positives <= 5
+    assert all(store.add(key) for key in keys)
+    assert len(store._filters) > 1
+
+
+def test_sqlite_store_persists_across_runs(tmp_path):
+    path = tmp_path / "dedup.db"
+
+    first = DuplicateHandler(SqliteDedupStore(path, "example.com", "listing"))
+    assert not first.on_save_data({"foo": "bar"})
+    assert not first.on_queue_url("https://example.com/1", {}, {})
+    first.flush()
+
+    second = DuplicateHandler(SqliteDedupStore(path, "example.com", "listing"))
+    assert second.on_save_data({"foo": "bar"})
+    assert second.on_queue_url("https://example.com/1", {}, {})
+
+    # A page that only contains rows from the previous run stops pagination
+    with pytest.raises(StopAsyncIteration):
+        second.on_paginate("https://example.com/2")
+
+
+def test_sqlite_store_is_keyed_by_domain_and_stage(tmp_path):
+    path = tmp_path / "dedup.db"
+    store = SqliteDedupStore(path, "example.com", "listing")
+    store.add(b"0" * 16)
+    store.close()
+
+    assert SqliteDedupStore(path, "example.com", "listing").add(b"0" * 16)
+    assert not SqliteDedupStore(path, "example.com", "detail").add(b"0" * 16)
+    assert not SqliteDedupStore(path, "example.org", "listing").add(b"0" * 16)
+
+
+def test_detect_change(tmp_path):
+    handler = DuplicateHandler(
+        content_index=SqliteContentIndex(tmp_path / "index.db", "example.com", "detail")
+    )
+
+    assert handler.detect_change("a", b"1" * 16) == "new"
+    assert handler.detect_change("a", b"1" * 16) == "unchanged"
+    assert handler.detect_change("a", b"2" * 16) == "changed"
+
+    with pytest.raises(RuntimeError):
+        DuplicateHandler().detect_change("a", b"1" * 16)
+
+
+def test_keyed_rows_reverting_to_earlier_content(tmp_path):
+    def run(row: dict) -> bool:
+        handler = DuplicateHandler(
+            SqliteDedupStore(tmp_path / "dedup.db", "example.com", "detail"),
+            content_index=SqliteContentIndex(
+                tmp_path / "index.db", "example.com", "detail"
+            ),
+        )
+        duplicated = handler.on_save_data(row)
+        handler.flush()
+        return duplicated
+
+    assert not run({"$primary_key": "a", "price": 1})
+    assert not run({"$primary_key": "a", "price": 2})
+    # The change back to the first price is reported, not suppressed by the dedup store
+    row = {"$primary_key": "a", "price": 1}
+    assert not run(row)
+    assert row["__change"] == "changed"
+    assert run({"$primary_key": "a", "price": 1})
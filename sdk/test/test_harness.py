@@ -51,3 +51,29 @@ async def test_with_two_connections():
             page_2.context.browser.contexts[0].pages[0].goto("https://www.reworkd.ai/")
         )
         assert page_1.url == "https://www.reworkd.ai/"
+
+
+async def test_attached_context_is_configured(mocker):
+    ctx = mocker.AsyncMock()
+    ctx.set_default_timeout = mocker.Mock()
+    browser = mocker.AsyncMock(contexts=[ctx])
+    p = mocker.AsyncMock()
+    p.chromium.connect_over_cdp.return_value = browser
+    playwright = mocker.patch("harambe.contrib.playwright.harness.async_playwright")
+    playwright.return_value.__aenter__.return_value = p
+
+    cookies = [{"url": "https://example.com", "name": "foo", "value": "bar"}]
+    async with playwright_harness(
+        cdp_endpoint="http://localhost:9222",
+        attach_to_existing_context=True,
+        headers={"X-Foo": "bar"},
+        cookies=cookies,
+        default_timeout=1234,
+    ):
+        pass
+
+    browser.new_context.assert_not_called()
+    ctx.set_default_timeout.assert_called_once_with(1234)
+    ctx.set_extra_http_headers.assert_awaited_once_with({"X-Foo": "bar"})
+    ctx.add_cookies.assert_awaited_once_with(cookies)
+    ctx.route.assert_awaited_once()
@@ -0,0 +1,233 @@
+import time
+
+import pytest
+from playwright.async_api import Error as PlaywrightError
+
+from harambe.handlers import CachingResourceHandler
+from harambe.http_cache import (
+    ResponseCache,
+    cache_key,
+    freshness_lifetime,
+    is_storable,
+)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.db", max_bytes=10)
+    yield cache
+    cache.close()
+
+
+def test_cache_key_includes_vary_headers():
+    url = "https://example.com/app.js"
+
+    assert cache_key("get", url) == cache_key("GET", url)
+    assert cache_key("GET", url, {"Accept-Language": "en"}) != cache_key(
+        "GET", url, {"accept-language": "fr"}
+    )
+
+
+@pytest.mark.parametrize(
+    "headers, lifetime",
+    [
+        ({"Cache-Control": "max-age=60"}, 60),
+        ({"Cache-Control": "public, max-age=60, s-maxage=120"}, 120),
+        ({"Cache-Control": "max-age=60", "Age": "50"}, 10),
+        ({"Cache-Control": "no-cache, max-age=60"}, 0),
+        (
+            {
+                "Date": "Mon, 06 Oct 2025 10:00:00 GMT",
+                "Expires": "Mon, 06 Oct 2025 11:00:00 GMT",
+            },
+            3600,
+        ),
+        ({"Expires": "0"}, 0),
+        ({}, 0),
+    ],
+)
+def test_freshness_lifetime(headers, lifetime):
+    assert freshness_lifetime(headers) == lifetime
+
+
+@pytest.mark.parametrize(
+    "status, headers, storable",
+    [
+        (200, {"ETag": '"v1"'}, True),
+        (200, {"Last-Modified": "Mon, 06 Oct 2025 10:00:00 GMT"}, True),
+        (200, {"Cache-Control": "max-age=60"}, True),
+        (200, {}, False),
+        (200, {"ETag": '"v1"', "Cache-Control": "no-store"}, False),
+        (404, {"ETag": '"v1"'}, False),
+    ],
+)
+def test_is_storable(status, headers, storable):
+    assert is_storable(status, headers) is storable
+
+
+def test_put_and_get(cache):
+    cache.put(
+        "a",
+        200,
+        {"Content-Type": "text/javascript", "Content-Encoding": "gzip"},
+        b"js",
+    )
+
+    cached = cache.get("a")
+    assert cached.body == b"js"
+    assert cached.headers == {"content-type": "text/javascript"}
+    assert cached.fresh
+    assert cache.get("b") is None
+
+
+def test_expired_entries_are_returned_stale(cache):
+    cache.put("a", 200, {}, b"js", expires_at=time.time() - 1)
+
+    assert not cache.get("a").fresh
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    cache.put("a", 200, {}, b"aaaa")
+    cache.put("b", 200, {}, b"bbbb")
+    cache.get("a")
+    cache.put("c", 200, {}, b"cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+    assert cache.size_in_bytes == 8
+    assert cache.put("d", 200, {}, b"d" * 11) is None
+
+
+def test_cache_persists_between_runs(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.db")
+    cache.put("a", 200, {}, b"js")
+    cache.put("a", 200, {}, b"js2")
+    cache.close()
+
+    cache = ResponseCache(tmp_path / "cache.db")
+    assert cache.get("a").body == b"js2"
+    assert cache.size_in_bytes == 3
+    assert len(cache) == 1
+
+
+def make_route(
+    mocker,
+    resource_type="script",
+    method="GET",
+    status=200,
+    cache_control="max-age=600",
+    body=b"js",
+    url="https://example.com/app.js",
+):
+    route = mocker.AsyncMock()
+    route.request = mocker.Mock(
+        url="https://example.com/app.js",
+        method=method,
+        resource_type=resource_type,
+        headers={"accept-language": "en"},
+    )
+    response = mocker.AsyncMock(
+        url=url,
+        status=status,
+        headers={
+            "content-type": "text/javascript",
+            "cache-control": cache_control,
+            "etag": '"v1"',
+        },
+    )
+    response.body.return_value = body
+    route.fetch.return_value = response
+    return route
+
+
+async def test_caching_handler_serves_from_cache(mocker, tmp_path):
+    handler = CachingResourceHandler(ResponseCache(tmp_path / "cache.db"))
+
+    first = make_route(mocker)
+    await handler.handle(first)
+    first.fetch.assert_awaited_once()
+    first.fulfill.assert_awaited_once_with(
+        status=200, headers=first.fetch.return_value.headers, body=b"js"
+    )
+
+    second = make_route(mocker)
+    await handler.handle(second)
+    second.fetch.assert_not_awaited()
+    second.fulfill.assert_awaited_once_with(
+        status=200,
+        headers={
+            "content-type": "text/javascript",
+            "cache-control": "max-age=600",
+            "etag": '"v1"',
+        },
+        body=b"js",
+    )
+
+
+async def test_caching_handler_revalidates_stale_assets(mocker, tmp_path):
+    cache = ResponseCache(tmp_path / "cache.db")
+    handler = CachingResourceHandler(cache)
+
+    await handler.handle(make_route(mocker, cache_control="no-cache"))
+    assert not cache.get(handler.key(make_route(mocker).request)).fresh
+
+    revalidated = make_route(mocker, status=304, body=b"")
+    await handler.handle(revalidated)
+    revalidated.fetch.assert_awaited_once_with(
+        headers={"accept-language": "en", "If-None-Match": '"v1"'}
+    )
+    assert revalidated.fulfill.await_args.kwargs["body"] == b"js"
+    assert revalidated.fulfill.await_args.kwargs["headers"]["cache-control"] == (
+        "max-age=600"
+    )
+
+    fresh = make_route(mocker)
+    await handler.handle(fresh)
+    fresh.fetch.assert_not_awaited()
+
+
+async def test_caching_handler_only_stores_storable_responses(mocker, tmp_path):
+    cache = ResponseCache(tmp_path / "cache.db")
+    handler = CachingResourceHandler(cache)
+
+    await handler.handle(make_route(mocker, cache_control="no-store"))
+    await handler.handle(make_route(mocker, status=404))
+
+    assert len(cache) == 0
+
+
+async def test_caching_handler_skips_redirected_responses(mocker, tmp_path):
+    cache = ResponseCache(tmp_path / "cache.db")
+    handler = CachingResourceHandler(cache, cache_documents=True)
+
+    route = make_route(mocker, "document", url="https://example.com/login")
+    await handler.handle(route)
+
+    route.fulfill.assert_awaited_once()
+    assert len(cache) == 0
+
+
+async def test_caching_handler_aborts_failed_fetches(mocker, tmp_path):
+    handler = CachingResourceHandler(ResponseCache(tmp_path / "cache.db"))
+    route = make_route(mocker)
+    route.fetch.side_effect = PlaywrightError("net::ERR_CONNECTION_RESET")
+
+    await handler.handle(route)
+
+    route.abort.assert_awaited_once_with("failed")
+    route.fulfill.assert_not_awaited()
+
+
+@pytest.mark.parametrize(
+    "resource_type, method", [("document", "GET"), ("image", "GET"), ("script", "POST")]
+)
+async def test_caching_handler_skips_other_requests(
+    mocker, tmp_path, resource_type, method
+):
+    handler = CachingResourceHandler(ResponseCache(tmp_path / "cache.db"))
+    route = make_route(mocker, resource_type, method)
+
+    await handler.handle(route)
+
+    route.fallback.assert_awaited_once()
+    route.fetch.assert_not_awaited()
@@ -237,3 +237,32 @@ def test_get_current_page_info(duplicate_handler):
     assert duplicate_handler.get_current_page_info() == PageInfo(
         page=2, total_rows=2, duplicated_rows=1
     )
+
+
+def test_compute_hash_is_canonical():
+    compute_hash = DuplicateHandler.compute_hash
+
+    assert compute_hash({"a": 1, "b": [1, 2]}) == compute_hash({"b": (1, 2), "a": 1})
+    assert compute_hash({"a": 1, "__url": "x"}) == compute_hash({"a": 1, "__url": "y"})
+    assert compute_hash({"a": 1}) != compute_hash({"a": "1"})
+    assert compute_hash([1, 23]) != compute_hash([12, 3])
+    assert compute_hash(["a,b"]) != compute_hash(["a", "b"])
+    assert compute_hash({"a": {"b": 1}}) != compute_hash({"a": {"b": True}})
+    assert len(compute_hash("https://example.com")) == 16
+    assert compute_hash('["a",1]') != compute_hash(("a", 1))
+    assert compute_hash('{"a":1}') != compute_hash({"a": 1})
+
+
+def test_page_history_is_bounded():
+    handler = DuplicateHandler(history_size=2)
+
+    for page in range(4):
+        handler.on_save_data({"page": page})
+        handler.on_paginate(f"https://example.com/page{page + 2}")
+
+    assert handler.get_number_of_pages() == 5
+    assert handler.get_page_history() == [
+        PageInfo(page=3, total_rows=1, duplicated_rows=0),
+        PageInfo(page=4, total_rows=1, duplicated_rows=0),
+        PageInfo(page=5, total_rows=0, duplicated_rows=0),
+    ]
@@ -0,0 +1,179 @@
+import asyncio
+
+import pytest
+
+from harambe.contrib.playwright.pool import BrowserPool
+
+
+class FakeContext:
+    def __init__(self, browser: "FakeBrowser") -> None:
+        self.browser = browser
+        self.closed = False
+
+    def set_default_timeout(self, timeout: int) -> None:
+        pass
+
+    async def route(self, *_) -> None:
+        pass
+
+    async def new_page(self) -> object:
+        return object()
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class FakeBrowser:
+    launched = 0
+
+    def __init__(self) -> None:
+        FakeBrowser.launched += 1
+        self.connected = True
+        self.contexts: list[FakeContext] = []
+
+    async def new_context(self, **_) -> FakeContext:
+        self.contexts.append(FakeContext(self))
+        return self.contexts[-1]
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    async def close(self) -> None:
+        self.connected = False
+
+
+@pytest.fixture
+async def pool(mocker):
+    FakeBrowser.launched = 0
+
+    async def launch():
+        return FakeBrowser()
+
+    pool = BrowserPool(size=2, contexts_per_browser=2, max_uses=3, warm_contexts=1)
+    mocker.patch.object(pool, "_launch", side_effect=launch)
+    await pool.start()
+    yield pool
+    await pool.close()
+
+
+async def test_leases_are_spread_across_browsers(pool):
+    async with pool.lease() as first, pool.lease() as second:
+        assert first is not second
+        assert [s["active"] for s in pool.stats] == [1, 1]
+
+    assert FakeBrowser.launched == 2
+
+
+async def test_lease_waits_when_pool_is_full(pool):
+    held = asyncio.Event()
+    release = asyncio.Event()
+
+    async def hold():
+        async with pool.lease():
+            held.set()
+            await release.wait()
+
+    holders = [asyncio.create_task(hold()) for _ in range(4)]
+    while sum(s["active"] for s in pool.stats) < 4:
+        await asyncio.sleep(0)
+
+    waiter = asyncio.create_task(pool.lease().__aenter__())
+    await asyncio.sleep(0.01)
+    assert not waiter.done()
+
+    release.set()
+    await asyncio.gather(*holders)
+    await asyncio.wait_for(waiter, 1)
+
+
+async def test_browser_is_recycled_after_max_uses(pool):
+    async with pool.lease() as browser:
+        pass
+    for _ in range(4):
+        async with pool.lease():
+            pass
+
+    assert not browser.is_connected()
+    assert FakeBrowser.launched == 3
+    assert all(s["connected"] for s in pool.stats)
+
+
+async def test_crashed_browser_is_replaced(pool):
+    async with pool.lease() as browser:
+        browser.connected = False
+
+    async with pool.lease() as first, pool.lease() as second:
+        assert browser not in (first, second)
+        assert first.is_connected() and second.is_connected()
+
+
+async def test_crashed_browser_is_relaunched_once(mocker):
+    FakeBrowser.launched = 0
+
+    async def launch():
+        await asyncio.sleep(0.01)
+        return FakeBrowser()
+
+    pool = BrowserPool(size=1, contexts_per_browser=2)
+    mocker.patch.object(pool, "_launch", side_effect=launch)
+    async with pool:
+
+        async def crash():
+            async with pool.lease() as browser:
+                await asyncio.sleep(0)
+                browser.connected = False
+
+        await asyncio.gather(crash(), crash())
+
+        assert FakeBrowser.launched == 2
+        assert pool.stats[0]["connected"]
+
+
+def warm_count(pool: BrowserPool) -> int:
+    return sum(s["warm"] for s in pool.stats)
+
+
+async def settle() -> None:
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+async def test_warm_contexts_are_reused_and_replenished(pool):
+    await pool.warm(user_agent="harambe")
+    assert warm_count(pool) == 1
+    warm_ctx = next(c for s in pool._slots for c in s.browser.contexts)
+
+    async with pool.lease_context(user_agent="harambe") as (ctx, _):
+        assert ctx is warm_ctx
+        await settle()
+        assert warm_count(pool) == 1
+
+    assert warm_ctx.closed
+
+
+async def test_warm_contexts_are_keyed_by_options(pool):
+    await pool.warm(user_agent="harambe")
+    warm_ctx = next(c for s in pool._slots for c in s.browser.contexts)
+
+    async with pool.lease_context(user_agent="other") as (ctx, _):
+        assert ctx is not warm_ctx
+        await settle()
+
+    # Only the options passed to `warm` are kept warm
+    assert warm_count(pool) == 1
+
+
+async def test_leases_with_distinct_options_leave_no_contexts_open(pool):
+    for i in range(20):
+        async with pool.lease_context(user_agent=f"agent {i}", cookies=[]):
+            pass
+        await settle()
+
+    assert warm_count(pool) == 0
+    assert all(c.closed for s in pool._slots for c in s.browser.contexts)
+    assert not pool._warm_options
+
+
+async def test_per_run_options_are_not_warmed(pool):
+    with pytest.raises(ValueError):
+        await pool.warm(response_archive=object())
@@ -0,0 +1,99 @@
+import asyncio
+import time
+
+import pytest
+
+from harambe.contrib.soup.impl import SoupPage
+from harambe.rate_limit import HostRate, HostRateLimiter, TokenBucket
+
+from .test_soup import FakeSession, listing
+
+
+async def test_token_bucket_rate():
+    bucket = TokenBucket(rate=50, burst=2)
+
+    start = time.monotonic()
+    for _ in range(6):
+        await bucket.acquire()
+
+    # Two tokens are available right away, the other four take 20ms each
+    assert 0.07 < time.monotonic() - start < 0.2
+
+
+async def test_token_bucket_drain():
+    bucket = TokenBucket(rate=20, burst=5)
+    bucket.drain()
+
+    start = time.monotonic()
+    await bucket.acquire()
+
+    assert time.monotonic() - start >= 0.04
+
+
+async def test_hosts_are_limited_independently():
+    limiter = HostRateLimiter(rate=10)
+
+    start = time.monotonic()
+    await asyncio.gather(
+        *(limiter.acquire(f"https://{host}.com/") for host in "abcdef")
+    )
+
+    assert time.monotonic() - start < 0.05
+    assert limiter.metrics["a.com"].requests == 1
+
+
+def test_adaptive_rate():
+    limiter = HostRateLimiter(rate=1, adaptive=True, increase=0.5, max_rate=2)
+    url = "https://example.com/"
+
+    limiter.feedback(url, 200, 0.1)
+    limiter.feedback(url, 200, 0.12)
+    assert limiter.metrics["example.com"].rate == 2
+
+    limiter.feedback(url, 429, 0.1)
+    assert limiter.metrics["example.com"].rate == 1
+
+    # Latency well above the fastest response seen stops the ramp up
+    for _ in range(5):
+        limiter.feedback(url, 200, 1)
+    assert limiter.metrics["example.com"].rate == 1
+
+    for _ in range(10):
+        limiter.feedback(url, 503)
+    rate = limiter.metrics["example.com"]
+    assert rate.rate == limiter.min_rate
+    assert rate.throttled == 11
+
+
+def test_fixed_rate_ignores_feedback():
+    limiter = HostRateLimiter(rate=3)
+
+    limiter.feedback("https://example.com/", 429, 0.2)
+    limiter.feedback("https://example.com/", 200, 0.1)
+
+    assert limiter.metrics == {
+        "example.com": HostRate(
+            rate=3, requests=0, throttled=1, latency=pytest.approx(0.18)
+        )
+    }
+
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        HostRateLimiter(rate=0)
+
+
+async def test_soup_page_requests_are_limited(mocker):
+    session = FakeSession({"https://example.com/": listing(1, 1)})
+    limiter = HostRateLimiter(rate=100)
+    feedback = mocker.spy(limiter, "feedback")
+    page = SoupPage(session, rate_limiter=limiter)  # type: ignore
+
+    await page.goto("https://example.com/")
+    await page.goto("https://example.com/missing")
+
+    assert [c.args[:2] for c in feedback.call_args_list] == [
+        ("https://example.com/", 200),
+        ("https://example.com/missing", 404),
+    ]
+    assert limiter.metrics["example.com"].requests == 2
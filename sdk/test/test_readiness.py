@@ -0,0 +1,58 @@
+import pytest
+from playwright.async_api import Page
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from harambe.contrib.soup.impl import SoupPage
+from harambe.readiness import wait_until_ready
+
+
+@pytest.fixture
+def page(mocker):
+    return mocker.AsyncMock(spec=Page)
+
+
+async def test_timeout_strategy_sleeps(page):
+    await wait_until_ready(page, "timeout", timeout=2000)
+
+    page.wait_for_timeout.assert_awaited_once_with(2000)
+
+
+async def test_network_idle_strategy(page):
+    await wait_until_ready(page, "network_idle", timeout=2000)
+
+    page.wait_for_load_state.assert_awaited_once_with("networkidle", timeout=2000)
+    page.wait_for_timeout.assert_not_awaited()
+
+
+async def test_selector_strategy(page):
+    await wait_until_ready(page, "selector", timeout=2000, selector="table tr")
+    page.wait_for_selector.assert_awaited_once_with(
+        "table tr", state="attached", timeout=2000
+    )
+
+    with pytest.raises(ValueError):
+        await wait_until_ready(page, "selector", timeout=2000)
+
+
+async def test_url_change_strategy(page):
+    await wait_until_ready(
+        page, "url_change", timeout=2000, previous_url="https://example.com"
+    )
+
+    predicate = page.wait_for_url.await_args.args[0]
+    assert not predicate("https://example.com")
+    assert predicate("https://example.com/?page=2")
+
+
+async def test_timeouts_are_not_fatal(page):
+    page.wait_for_load_state.side_effect = PlaywrightTimeoutError("Timeout")
+
+    await wait_until_ready(page, "network_idle", timeout=2000)
+
+
+async def test_soup_page_is_a_no_op(mocker):
+    page = mocker.Mock(spec=SoupPage)
+
+    await wait_until_ready(page, "network_idle", timeout=2000)
+
+    assert not page.method_calls
@@ -0,0 +1,126 @@
+import zipfile
+
+import pytest
+from playwright.async_api import Error as PlaywrightError
+
+from harambe.contrib import soup_harness
+from harambe.contrib.soup.impl import SoupPage
+from harambe.handlers import CachingResourceHandler, ReplayHandler
+from harambe.http_cache import ResponseCache
+from harambe.replay import ResponseArchive
+
+from .test_http_cache import make_route
+from .test_soup import FakeSession, listing
+
+
+def test_archive_round_trip(tmp_path):
+    path = tmp_path / "run.zip"
+    with ResponseArchive(path, "record") as archive:
+        archive.record("GET", "https://example.com/", 200, {"ETag": "1"}, b"v1")
+        archive.record("GET", "https://example.com/", 200, {}, b"v2")
+        archive.record("GET", "https://example.com/copy", 200, {}, b"v1")
+        archive.record("POST", "https://example.com/api", 201, {}, b"{}", b'{"q":1}')
+
+    # Identical bodies are only stored once
+    assert (
+        len([n for n in zipfile.ZipFile(path).namelist() if n.startswith("bodies/")])
+        == 3
+    )
+
+    with ResponseArchive(path, "replay") as archive:
+        assert len(archive) == 4
+        first = archive.replay("GET", "https://example.com/")
+        assert first.body == b"v1"
+        assert first.headers == {"etag": "1"}
+        assert archive.replay("get", "https://example.com/").body == b"v2"
+        assert archive.replay("GET", "https://example.com/").body == b"v2"
+        assert archive.replay("GET", "https://example.com/copy").body == b"v1"
+        assert (
+            archive.replay("POST", "https://example.com/api", b'{"q":1}').status == 201
+        )
+        assert archive.replay("POST", "https://example.com/api", b'{"q":2}') is None
+        assert archive.replay("GET", "https://example.com/missing") is None
+
+
+async def test_soup_page_replays_without_network(tmp_path):
+    path = tmp_path / "run.zip"
+    session = FakeSession({"https://example.com/": listing(1, 1)})
+
+    with ResponseArchive(path, "record") as archive:
+        page = SoupPage(session, archive=archive)  # type: ignore
+        await page.goto("https://example.com/")
+
+    with ResponseArchive(path, "replay") as archive:
+        page = SoupPage(session, archive=archive)  # type: ignore
+        res = await page.goto("https://example.com/")
+        assert res.status == 200
+        assert await page.inner_text("h1") == "Page 1"
+
+        with pytest.raises(LookupError):
+            await page.goto("https://example.com/missing")
+
+    assert session.requests == ["https://example.com/"]
+
+
+async def test_record_and_replay_are_exclusive(tmp_path):
+    with pytest.raises(ValueError):
+        async with soup_harness(
+            record_to=tmp_path / "a.zip", replay_from=tmp_path / "b.zip"
+        ):
+            pass
+
+
+async def test_recording_aborts_failed_fetches(mocker, tmp_path):
+    route = mocker.AsyncMock()
+    route.request = mocker.Mock(
+        url="https://example.com/", method="GET", post_data_buffer=None
+    )
+    route.fetch.side_effect = PlaywrightError("net::ERR_CONNECTION_RESET")
+
+    with ResponseArchive(tmp_path / "run.zip", "record") as archive:
+        await ReplayHandler(archive).handle(route)
+        assert len(archive) == 0
+
+    route.abort.assert_awaited_once_with("failed")
+    route.fulfill.assert_not_awaited()
+
+
+async def test_recording_goes_through_the_cache(mocker, tmp_path):
+    cache = CachingResourceHandler(ResponseCache(tmp_path / "cache.db"))
+    await cache.handle(make_route(mocker))
+
+    route = make_route(mocker)
+    route.request.post_data_buffer = None
+    with ResponseArchive(tmp_path / "run.zip", "record") as archive:
+        await ReplayHandler(archive, cache).handle(route)
+
+    route.fetch.assert_not_awaited()
+    route.fulfill.assert_awaited_once()
+    with ResponseArchive(tmp_path / "run.zip", "replay") as archive:
+        assert archive.replay("GET", "https://example.com/app.js").body == b"js"
+
+
+async def test_recording_drops_encoding_headers(mocker, tmp_path):
+    route = mocker.AsyncMock()
+    route.request = mocker.Mock(
+        url="https://example.com/", method="GET", post_data_buffer=None
+    )
+    route.fetch.return_value = mocker.AsyncMock(
+        status=200,
+        headers={
+            "content-type": "text/html",
+            "content-encoding": "gzip",
+            "content-length": "20",
+        },
+    )
+    route.fetch.return_value.body.return_value = b"<html>decoded</html>!"
+
+    with ResponseArchive(tmp_path / "run.zip", "record") as archive:
+        await ReplayHandler(archive).handle(route)
+
+    route.fulfill.assert_awaited_once_with(
+        status=200, headers={"content-type": "text/html"}, body=b"<html>decoded</html>!"
+    )
+    with ResponseArchive(tmp_path / "run.zip", "replay") as archive:
+        recorded = archive.replay("GET", "https://example.com/")
+        assert recorded.headers == {"content-type": "text/html"}
@@ -0,0 +1,153 @@
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+from harambe_core.errors import CircuitOpenError, GotoError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from harambe import SDK
+from harambe.contrib.soup.impl import SoupPage
+from harambe.retry import CircuitBreaker, RetryPolicy, goto_with_retry, retry_after
+
+from .test_soup import FakeSession, listing
+
+
+class FlakyPage:
+    def __init__(self, *outcomes) -> None:
+        self.outcomes = list(outcomes)
+        self.visited: list[str] = []
+
+    async def goto(self, url: str):
+        self.visited.append(url)
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        status, headers = outcome if isinstance(outcome, tuple) else (outcome, {})
+        return SimpleNamespace(status=status, headers=headers)
+
+
+@pytest.fixture
+def sleeps(mocker):
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    mocker.patch("harambe.retry.asyncio.sleep", sleep)
+    return delays
+
+
+def test_backoff_delays():
+    policy = RetryPolicy(base_delay=1, max_delay=5, jitter=False)
+
+    assert [policy.delay(n) for n in range(1, 6)] == [1, 2, 4, 5, 5]
+    assert 0 <= RetryPolicy(base_delay=1).delay(3) <= 4
+    assert policy.delay(1, {"Retry-After": "3"}) == 3
+    assert policy.delay(1, {"retry-after": "120"}) == 5
+
+
+def test_retry_after():
+    assert retry_after({"Retry-After": "7"}) == 7
+    assert retry_after({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}) == 0
+    assert retry_after({"Retry-After": "soon"}) is None
+    assert retry_after({}) is None
+
+
+async def test_retries_transient_failures(sleeps):
+    page = FlakyPage(
+        PlaywrightTimeoutError("timeout"), (429, {"Retry-After": "2"}), 200
+    )
+
+    response = await goto_with_retry(page, "https://example.com/", RetryPolicy())
+
+    assert response.status == 200
+    assert len(page.visited) == 3
+    assert sleeps[0] <= 1 and sleeps[1] == 2
+
+
+async def test_gives_up_after_max_attempts(sleeps):
+    policy = RetryPolicy(max_attempts=2, jitter=False)
+
+    response = await goto_with_retry(FlakyPage(503), "https://example.com/", policy)
+    assert response.status == 503
+
+    with pytest.raises(ConnectionResetError):
+        await goto_with_retry(
+            FlakyPage(ConnectionResetError()), "https://example.com/", policy
+        )
+    assert sleeps == [1, 1]
+
+
+async def test_client_errors_are_not_retried(sleeps):
+    page = FlakyPage(404)
+
+    response = await goto_with_retry(page, "https://example.com/", RetryPolicy())
+
+    assert response.status == 404
+    assert len(page.visited) == 1
+    assert sleeps == []
+
+
+async def test_circuit_breaker(sleeps, mocker):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    policy = RetryPolicy(max_attempts=5)
+    down = FlakyPage(502)
+
+    with pytest.raises(CircuitOpenError):
+        await goto_with_retry(down, "https://down.com/a", policy, breaker)
+    assert len(down.visited) == 3
+
+    with pytest.raises(CircuitOpenError):
+        await goto_with_retry(down, "https://down.com/b", policy, breaker)
+    assert len(down.visited) == 3
+
+    # Other hosts are unaffected
+    assert (
+        await goto_with_retry(FlakyPage(200), "https://up.com/", policy, breaker)
+    ).status == 200
+
+    # After the timeout a single navigation tries the host again and closes the circuit
+    now = mocker.patch("harambe.retry.time.monotonic", return_value=10**6)
+    up = FlakyPage(200)
+    assert (
+        await goto_with_retry(up, "https://down.com/c", policy, breaker)
+    ).status == 200
+    assert not breaker.is_open("https://down.com/")
+
+    now.return_value += 1
+    with pytest.raises(CircuitOpenError):
+        for _ in range(4):
+            await goto_with_retry(
+                down, "https://down.com/d", RetryPolicy(max_attempts=1), breaker
+            )
+
+
+async def test_sdk_run_retries_navigation(sleeps):
+    class ThrottledSession(FakeSession):
+        async def get(self, url: str, **kwargs):
+            res = await super().get(url)
+            if len(self.requests) == 1:
+                res.status_code = 429
+            return res
+
+    session = ThrottledSession({"https://example.com/": listing(1, 1)})
+
+    @asynccontextmanager
+    async def harness(**_):
+        async def factory(*_, **__):
+            return SoupPage(session)  # type: ignore
+
+        yield factory
+
+    titles = []
+
+    async def scraper(sdk: SDK, *_) -> None:
+        titles.append(await sdk.page.inner_text("h1"))
+
+    await SDK.run(scraper, "https://example.com/", harness=harness, retry=RetryPolicy())
+    assert titles == ["Page 1"]
+    assert session.requests == ["https://example.com/"] * 2
+
+    session.requests.clear()
+    with pytest.raises(GotoError):
+        await SDK.run(scraper, "https://example.com/", harness=harness)
@@ -1,12 +1,20 @@
+import asyncio
+import traceback
 from unittest.mock import AsyncMock, call
 
 import pytest
 from playwright.async_api import Page
 
 from harambe.core import SDK, URL, AsyncScraperType, Context
+from harambe.dedup import SqliteContentIndex
+from harambe.pagination import DuplicateHandler
 from harambe_core import Schema
 from harambe_core.errors import SchemaValidationError
-from harambe_core.observer import OutputObserver
+from harambe_core.observer import (
+    DownloadedFile,
+    LocalStorageObserver,
+    OutputObserver,
+)
 
 
 @pytest.fixture
@@ -132,3 +140,138 @@ async def test_sdk_save_data_does_not_save_invalid_data(page):
 
     with pytest.raises(SchemaValidationError):
         await sdk.save_data(*data)
+
+
+async def test_save_data_suppresses_unchanged_rows(page, tmp_path):
+    schema = {
+        "$primary_key": "CONCAT(sku)",
+        "sku": {"type": "string"},
+        "price": {"type": "string"},
+    }
+
+    async def run(*rows):
+        observer = AsyncMock(spec=OutputObserver)
+        index = SqliteContentIndex(tmp_path / "index.db", "example.com", "detail")
+        sdk = SDK(
+            page,
+            observer=observer,
+            schema=dict(schema),
+            deduper=DuplicateHandler(content_index=index),
+        )
+        await sdk.save_data(*rows)
+        index.close()
+        return [c.args[0] for c in observer.on_save_data.await_args_list]
+
+    first = await run({"sku": "a", "price": "1"}, {"sku": "b", "price": "2"})
+    assert [row["__change"] for row in first] == ["new", "new"]
+
+    second = await run({"sku": "a", "price": "1"}, {"sku": "b", "price": "3"})
+    assert [(row["sku"], row["__change"]) for row in second] == [("b", "changed")]
+
+
+async def test_unchanged_rows_do_not_stop_pagination(page, tmp_path):
+    schema = {"$primary_key": "CONCAT(sku)", "sku": {"type": "string"}}
+
+    async def crawl() -> list[int]:
+        visited: list[int] = []
+
+        async def scraper(sdk: SDK, url: URL, context: Context) -> None:
+            current = len(visited) + 1
+            visited.append(current)
+            await sdk.save_data({"sku": f"{current}-a"}, {"sku": f"{current}-b"})
+
+            async def pager():
+                return (
+                    f"https://example.com/?page={current + 1}" if current < 3 else None
+                )
+
+            await sdk.paginate(pager, timeout=0)
+
+        index = SqliteContentIndex(tmp_path / "index.db", "example.com", "listing")
+        sdk = SDK(
+            page,
+            observer=AsyncMock(spec=OutputObserver),
+            schema=dict(schema),
+            scraper=scraper,
+            deduper=DuplicateHandler(content_index=index),
+        )
+        await scraper(sdk, "https://example.com", {})
+        index.close()
+        return visited
+
+    assert await crawl() == [1, 2, 3]
+    # Every row is already in the index, the recrawl still goes through every page
+    assert await crawl() == [1, 2, 3]
+
+
+@pytest.mark.parametrize("max_pages, expected_pages", [(None, 1500), (10, 10)])
+async def test_paginate_is_iterative(page, max_pages, expected_pages):
+    stack_depths = []
+
+    async def scraper(sdk: SDK, url: URL, context: Context) -> None:
+        stack_depths.append(len(traceback.extract_stack()))
+        current = len(stack_depths)
+        await sdk.save_data({"page": current})
+
+        async def pager():
+            return (
+                f"https://example.com/?page={current + 1}" if current < 1500 else None
+            )
+
+        await sdk.paginate(pager, timeout=0, max_pages=max_pages)
+
+    observer = AsyncMock(spec=OutputObserver)
+    sdk = SDK(page, observer=observer, scraper=scraper)
+    await scraper(sdk, "https://example.com", {})
+
+    assert len(stack_depths) == expected_pages
+    assert observer.on_save_data.await_count == expected_pages
+    assert observer.on_paginate.await_count == expected_pages - 1
+    assert len(set(stack_depths[1:])) == 1
+
+
+async def test_capture_download_hands_observers_the_file(page, mocker, tmp_path):
+    path = tmp_path / "report.pdf"
+    path.write_bytes(b"%PDF-1.7")
+    download = mocker.AsyncMock(
+        url="https://example.com/report", suggested_filename="report.pdf"
+    )
+    download.path.return_value = path
+    info = mocker.MagicMock()
+    info.__aenter__.return_value.value = asyncio.sleep(0, download)
+    page.expect_download = mocker.MagicMock(return_value=info)
+
+    tracker = mocker.Mock()
+    file_observer = LocalStorageObserver(tracker)
+    legacy_observer = AsyncMock(spec=OutputObserver)
+    sdk = SDK(page, observer=[file_observer, legacy_observer])
+
+    meta = await sdk.capture_download(mocker.AsyncMock())
+
+    assert meta == {
+        "url": "https://example.com/report/report.pdf",
+        "filename": "report.pdf",
+        "path": str(path),
+    }
+    tracker.save_data.assert_called_once_with(meta)
+    legacy_observer.on_download.assert_awaited_once_with(
+        "https://example.com/report", "report.pdf", b"%PDF-1.7", str(path)
+    )
+
+
+async def test_legacy_observers_share_one_read_of_large_downloads(mocker, tmp_path):
+    path = tmp_path / "report.pdf"
+    path.write_bytes(b"%PDF-1.7")
+    observers = [AsyncMock(spec=OutputObserver) for _ in range(3)]
+    sdk = SDK(mocker.AsyncMock(), observer=observers)
+    read_bytes = mocker.spy(type(path), "read_bytes")
+
+    await sdk._notify_download(
+        "https://example.com/report", "report.pdf", DownloadedFile(path, 0)
+    )
+
+    assert read_bytes.call_count == 1
+    for observer in observers:
+        observer.on_download.assert_awaited_once_with(
+            "https://example.com/report", "report.pdf", b"%PDF-1.7", str(path)
+        )
@@ -0,0 +1,447 @@
+import asyncio
+
+import pytest
+from soupsieve import SelectorSyntaxError
+
+from harambe import SDK
+from harambe.contrib.soup import impl, register_selectors, selector_cache
+from harambe.contrib.soup.impl import SoupPage
+from harambe.contrib.soup.selector_cache import compile_selector
+from harambe.http_cache import ResponseCache
+from harambe.retry import RetryPolicy
+from harambe_core.errors import GotoError
+from harambe_core.observer import InMemoryObserver
+
+
+class FakeResponse:
+    def __init__(self, url: str, text: str, status_code: int = 200) -> None:
+        self.url = url
+        self.text = text
+        self.content = text.encode()
+        self.status_code = status_code
+        self.headers = {"Content-Type": "text/html"}
+
+
+class FakeSession:
+    def __init__(self, pages: dict[str, str]) -> None:
+        self.pages = pages
+        self.requests: list[str] = []
+
+    async def get(self, url: str, **kwargs) -> FakeResponse:
+        self.requests.append(url)
+        await asyncio.sleep(0)
+        if url not in self.pages:
+            return FakeResponse(url, "<html></html>", status_code=404)
+        return FakeResponse(url, self.pages[url])
+
+
+def listing(page: int, last: int) -> str:
+    link = f'<a href="/list?page={page + 1}">next</a>' if page < last else ""
+    return f"<html><body><h1>Page {page}</h1>{link}</body></html>"
+
+
+@pytest.fixture
+def session():
+    return FakeSession(
+        {f"https://example.com/list?page={i}": listing(i, 4) for i in range(1, 5)}
+    )
+
+
+async def test_goto_uses_prefetched_response(session):
+    page = SoupPage(session, prefetch=True)  # type: ignore
+
+    page.prefetch("https://example.com/list?page=2")
+    await asyncio.sleep(0)
+    await page.goto("https://example.com/list?page=2")
+
+    assert session.requests == ["https://example.com/list?page=2"]
+    assert await page.inner_text("h1") == "Page 2"
+
+
+async def test_paginate_prefetches_next_page(session, mocker):
+    page = SoupPage(session, prefetch=True)  # type: ignore
+    prefetch = mocker.spy(page, "prefetch")
+    observer = InMemoryObserver()
+
+    async def scraper(sdk: SDK, *_) -> None:
+        await sdk.save_data({"title": await sdk.page.inner_text("h1")})
+
+        async def pager():
+            link = await sdk.page.query_selector("a")
+            return await link.get_attribute("href")
+
+        await sdk.paginate(pager)
+
+    sdk = SDK(page, observer=observer, scraper=scraper)
+    await page.goto("https://example.com/list?page=1")
+    await scraper(sdk, page.url, {})
+
+    assert [row["title"] for row in observer.data] == [
+        "Page 1",
+        "Page 2",
+        "Page 3",
+        "Page 4",
+    ]
+    assert [c.args[0] for c in prefetch.call_args_list] == [
+        "https://example.com/list?page=3",
+        "https://example.com/list?page=4",
+    ]
+    # Every page is requested exactly once even though pages 3 and 4 were prefetched
+    assert session.requests == [
+        f"https://example.com/list?page={i}" for i in range(1, 5)
+    ]
+
+
+async def test_paginate_range(session):
+    observer = InMemoryObserver()
+    created = []
+
+    async def page_factory() -> SoupPage:
+        created.append(SoupPage(session))  # type: ignore
+        return created[-1]
+
+    failed = []
+
+    async def on_error(url: str, status: int, *_) -> None:
+        failed.append((url, status))
+
+    async def scraper(sdk: SDK, url: str, *_) -> None:
+        await sdk.save_data({"title": await sdk.page.inner_text("h1")})
+        if url.endswith("page=1"):
+            await sdk.paginate_range(
+                "/list?page={}",
+                range(2, 6),
+                concurrency=2,
+                goto_error_handler=on_error,
+            )
+        else:
+
+            async def pager():
+                raise AssertionError("paginate is ignored within paginate_range")
+
+            await sdk.paginate(pager)
+
+    page = await page_factory()
+    sdk = SDK(page, observer=observer, scraper=scraper, page_factory=page_factory)
+    await page.goto("https://example.com/list?page=1")
+    await scraper(sdk, page.url, {})
+
+    assert sorted(row["title"] for row in observer.data) == [
+        "Page 1",
+        "Page 2",
+        "Page 3",
+        "Page 4",
+    ]
+    assert {row["__url"] for row in observer.data} == {
+        f"https://example.com/list?page={i}" for i in range(1, 5)
+    }
+    # Page 5 doesn't exist, it is reported and skipped
+    assert failed == [("https://example.com/list?page=5", 404)]
+    assert [(p.page, p.total_rows) for p in sdk._deduper.get_page_history()] == [
+        (1, 1),
+        (2, 1),
+        (3, 1),
+        (4, 1),
+    ]
+    assert len(created) == 3
+
+
+class RevalidatingSession(FakeSession):
+    def __init__(self, pages: dict[str, str], cache_control: str) -> None:
+        super().__init__(pages)
+        self.cache_control = cache_control
+        self.sent_headers: list[dict[str, str]] = []
+
+    async def get(self, url: str, headers=None, **kwargs) -> FakeResponse:
+        self.sent_headers.append(dict(headers or {}))
+        res = await super().get(url)
+        if (headers or {}).get("If-None-Match") == '"v1"':
+            res = FakeResponse(url, "", status_code=304)
+        res.headers = {
+            **res.headers,
+            "ETag": '"v1"',
+            "Cache-Control": self.cache_control,
+        }
+        return res
+
+
+async def test_stale_pages_are_revalidated(tmp_path):
+    session = RevalidatingSession({"https://example.com/": listing(1, 1)}, "no-cache")
+    page = SoupPage(session, cache=ResponseCache(tmp_path / "cache.db"))  # type: ignore
+
+    first = await page.goto("https://example.com/")
+    second = await page.goto("https://example.com/")
+
+    assert first.status == second.status == 200
+    assert session.sent_headers == [{}, {"If-None-Match": '"v1"'}]
+    assert await page.inner_text("h1") == "Page 1"
+
+
+async def test_fresh_pages_are_served_from_cache(tmp_path):
+    session = RevalidatingSession({"https://example.com/": listing(1, 1)}, "max-age=60")
+    page = SoupPage(session, cache=ResponseCache(tmp_path / "cache.db"))  # type: ignore
+
+    await page.goto("https://example.com/")
+    await page.goto("https://example.com/")
+
+    assert session.requests == ["https://example.com/"]
+    assert await page.inner_text("h1") == "Page 1"
+
+
+@pytest.mark.parametrize("parser", ["html.parser", "lxml", "selectolax"])
+async def test_parser_backends(parser):
+    html = (
+        "<html><head><title>Products</title></head><body>"
+        '<ul><li><a href="/1">One <b>1</b></a></li><li><a href="/2">Two</a></li></ul>'
+        "</body></html>"
+    )
+    session = FakeSession({"https://example.com/": html})
+    page = SoupPage(session, parser=parser)  # type: ignore
+
+    await page.goto("https://example.com/")
+
+    assert await page.title() == "Products"
+    links = await page.query_selector_all("ul a")
+    assert [await link.get_attribute("href") for link in links] == ["/1", "/2"]
+    assert await links[0].inner_text() == "One 1"
+    assert await links[0].inner_html() == "One <b>1</b>"
+    item = await page.query_selector("li")
+    assert await (await item.query_selector("b")).text_content() == "1"
+    assert await page.query_selector("table") is None
+    assert "<title>Products</title>" in await page.content()
+
+
+async def test_content_is_the_response_text():
+    html = "<html><body><h1>Title</h1><a href=/2>next</a><br></body></html>"
+    page = SoupPage(FakeSession({"https://example.com/": html}))  # type: ignore
+
+    await page.goto("https://example.com/")
+    assert await page.content() == html
+    assert await page.inner_text("h1") == "Title"
+    # Not the parsed document serialized again
+    assert await page.content() == html
+
+
+async def test_pages_are_parsed_on_first_query(session, mocker):
+    parse_html = mocker.spy(impl, "parse_html")
+    page = SoupPage(session)  # type: ignore
+
+    await page.goto("https://example.com/list?page=1")
+    await page.goto("https://example.com/list?page=2")
+    assert await page.content() == listing(2, 4)
+    assert parse_html.call_count == 0
+
+    assert await page.inner_text("h1") == "Page 2"
+    assert await page.title() is None
+    assert parse_html.call_count == 1
+
+    await page.goto("https://example.com/list?page=3")
+    assert await page.inner_text("h1") == "Page 3"
+    assert parse_html.call_count == 2
+
+
+def test_compiled_selectors_are_cached():
+    assert compile_selector("ul > li a") is compile_selector("ul > li a")
+
+
+def test_registered_selectors(mocker):
+    compile = mocker.spy(selector_cache.soupsieve, "compile")
+
+    @SDK.with_selectors("div.registered", "a.registered")
+    async def scraper(sdk: SDK, *_) -> None:
+        pass
+
+    compile_selector("div.registered")
+    assert compile.call_count == 2
+
+    with pytest.raises(SelectorSyntaxError):
+        register_selectors("div[")
+
+
+class SlowSession(FakeSession):
+    def __init__(self, pages: dict[str, str]) -> None:
+        super().__init__(pages)
+        self.in_flight: dict[str, int] = {}
+        self.peak: dict[str, int] = {}
+
+    async def get(self, url: str, **kwargs) -> FakeResponse:
+        host = url.split("/")[2]
+        self.in_flight[host] = self.in_flight.get(host, 0) + 1
+        self.peak[host] = max(self.peak.get(host, 0), self.in_flight[host])
+        # Later urls answer first
+        await asyncio.sleep(0.01 * (len(self.pages) - len(self.requests)))
+        res = await super().get(url)
+        self.in_flight[host] -= 1
+        return res
+
+
+async def test_goto_many():
+    urls = [f"https://{host}.com/list?page={i}" for host in "ab" for i in range(1, 5)]
+    session = SlowSession({url: listing(i % 4 + 1, 4) for i, url in enumerate(urls)})
+    page = SoupPage(session)  # type: ignore
+
+    loaded = [p async for p in page.goto_many(urls + urls[:2], per_host=2)]
+
+    assert sorted(p.url for p in loaded) == sorted(urls)
+    assert [p.url for p in loaded] != urls
+    assert all([await p.inner_text("h1") for p in loaded])
+    assert session.peak == {"a.com": 2, "b.com": 2}
+    assert page.url == "about:blank"
+
+
+async def test_goto_many_concurrency():
+    urls = [f"https://example.com/list?page={i}" for i in range(1, 5)]
+    session = SlowSession({url: listing(1, 1) for url in urls})
+    page = SoupPage(session)  # type: ignore
+
+    async for _ in page.goto_many(urls, concurrency=1):
+        pass
+
+    assert session.peak == {"example.com": 1}
+    assert session.requests == urls
+
+
+async def test_goto_many_stops_requests_when_closed_early():
+    urls = [f"https://example.com/list?page={i}" for i in range(1, 5)]
+    cancelled = []
+
+    class HangingSession(FakeSession):
+        async def get(self, url: str, **kwargs):
+            if url != urls[0]:
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.append(url)
+                    raise
+            return await super().get(url)
+
+    page = SoupPage(HangingSession({url: listing(1, 1) for url in urls}))  # type: ignore
+
+    pages = page.goto_many(urls)
+    async for _ in pages:
+        break
+    await pages.aclose()
+
+    assert sorted(cancelled) == urls[1:]
+    assert asyncio.all_tasks() == {asyncio.current_task()}
+
+
+async def test_prefetch_calls_stateful_pagers_once_per_page(session):
+    page = SoupPage(session, prefetch=True)  # type: ignore
+    observer = InMemoryObserver()
+    number = 1
+    calls = 0
+
+    async def scraper(sdk: SDK, *_) -> None:
+        await sdk.save_data({"title": await sdk.page.inner_text("h1")})
+
+        async def pager():
+            nonlocal number, calls
+            calls += 1
+            number += 1
+            return f"/list?page={number}" if number <= 4 else None
+
+        await sdk.paginate(pager)
+
+    sdk = SDK(page, observer=observer, scraper=scraper)
+    await page.goto("https://example.com/list?page=1")
+    await scraper(sdk, page.url, {})
+
+    assert [row["title"] for row in observer.data] == [
+        "Page 1",
+        "Page 2",
+        "Page 3",
+        "Page 4",
+    ]
+    assert calls == 4
+
+
+async def test_prefetch_stops_at_max_pages(session):
+    page = SoupPage(session, prefetch=True)  # type: ignore
+
+    async def scraper(sdk: SDK, url: str, *_) -> None:
+        async def pager():
+            number = int(url.rsplit("=", 1)[1]) + 1
+            return f"/list?page={number}"
+
+        await sdk.paginate(pager, max_pages=2)
+
+    sdk = SDK(page, scraper=scraper)
+    await page.goto("https://example.com/list?page=1")
+    await scraper(sdk, page.url, {})
+    # Let any prefetch that was started reach the session
+    await asyncio.sleep(0)
+
+    assert session.requests == [
+        "https://example.com/list?page=1",
+        "https://example.com/list?page=2",
+    ]
+
+
+async def test_paginate_range_called_from_every_page(session):
+    observer = InMemoryObserver()
+
+    async def page_factory() -> SoupPage:
+        return SoupPage(session)  # type: ignore
+
+    async def scraper(sdk: SDK, *_) -> None:
+        await sdk.save_data({"title": await sdk.page.inner_text("h1")})
+        await sdk.paginate_range("/list?page={}", range(2, 5))
+
+    page = await page_factory()
+    sdk = SDK(page, observer=observer, scraper=scraper, page_factory=page_factory)
+    await page.goto("https://example.com/list?page=1")
+    await scraper(sdk, page.url, {})
+
+    assert len(observer.data) == 4
+    assert len(session.requests) == 4
+
+
+async def test_paginate_range_reports_failed_pages(session, mocker):
+    mocker.patch("harambe.retry.asyncio.sleep")
+
+    async def page_factory() -> SoupPage:
+        return SoupPage(session)  # type: ignore
+
+    async def scraper(sdk: SDK, *_) -> None:
+        pass
+
+    page = await page_factory()
+    sdk = SDK(page, scraper=scraper, page_factory=page_factory)
+    await page.goto("https://example.com/list?page=1")
+
+    with pytest.raises(GotoError, match="page=5"):
+        await sdk.paginate_range(
+            "/list?page={}", range(2, 6), retry=RetryPolicy(retry_statuses=[404])
+        )
+    # The missing page was retried before failing the run
+    assert session.requests.count("https://example.com/list?page=5") == 3
+
+
+async def test_paginate_range_stops_other_pages_on_error(session):
+    events = []
+
+    class ClosingPage(SoupPage):
+        async def close(self) -> None:
+            events.append("closed")
+
+    async def page_factory() -> SoupPage:
+        return ClosingPage(session)  # type: ignore
+
+    async def scraper(sdk: SDK, url: str, *_) -> None:
+        if url.endswith("page=2"):
+            raise ValueError("broken page")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            events.append("cancelled")
+            raise
+
+    page = await page_factory()
+    sdk = SDK(page, scraper=scraper, page_factory=page_factory)
+    await page.goto("https://example.com/list?page=1")
+
+    with pytest.raises(ValueError):
+        await sdk.paginate_range("/list?page={}", range(2, 5), concurrency=3)
+
+    assert events == ["cancelled", "cancelled", "closed", "closed", "closed"]